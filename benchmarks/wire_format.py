@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Compares the JSON and protobuf responses of the apiserver.
+
+Reports, per resource, the bytes received on the wire for both content types,
+and the time spent decoding the JSON responses into the client's models.
+The kubernetes client ships no messages for the k8s.io/api protobuf types,
+so protobuf responses are measured on the wire only.
+
+Usage: python benchmarks/wire_format.py --namespace polyaxon --repeat 5
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import collections
+import time
+
+from polyaxon_k8s.manager import K8SManager
+
+JSON = "application/json"
+PROTOBUF = "application/vnd.kubernetes.protobuf"
+
+RESOURCES = [
+    ("pods", "/api/v1/namespaces/{namespace}/pods", "V1PodList"),
+    ("jobs", "/apis/batch/v1/namespaces/{namespace}/jobs", "V1JobList"),
+    ("services", "/api/v1/namespaces/{namespace}/services", "V1ServiceList"),
+    ("nodes", "/api/v1/nodes", "V1NodeList"),
+]
+
+Response = collections.namedtuple("Response", ["data"])
+
+
+def fetch(api_client, path, namespace, content_type):
+    resp = api_client.call_api(
+        path,
+        "GET",
+        path_params={"namespace": namespace},
+        header_params={"Accept": "{}, {}".format(content_type, JSON)},
+        auth_settings=["BearerToken"],
+        _return_http_data_only=True,
+        _preload_content=False,
+    )
+    return resp.read(), resp.headers.get("Content-Type")
+
+
+def decode(api_client, raw, response_type):
+    return api_client.deserialize(Response(data=raw.decode("utf-8")), response_type)
+
+
+def run(manager, repeat):
+    api_client = manager.k8s_api.api_client
+    print(
+        "{:<10} {:<36} {:>12} {:>12}".format(
+            "resource", "content type", "wire bytes", "decode ms"
+        )
+    )
+    for name, path, response_type in RESOURCES:
+        for content_type in (JSON, PROTOBUF):
+            wire_bytes = 0
+            decode_time = 0
+            for _ in range(repeat):
+                raw, received = fetch(api_client, path, manager.namespace, content_type)
+                wire_bytes += len(raw)
+                if received.startswith(JSON):
+                    start = time.time()
+                    decode(api_client, raw, response_type)
+                    decode_time += time.time() - start
+            print(
+                "{:<10} {:<36} {:>12} {:>12}".format(
+                    name,
+                    received,
+                    wire_bytes // repeat,
+                    "{:.2f}".format(1000 * decode_time / repeat)
+                    if received.startswith(JSON)
+                    else "-",
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--namespace", default="default")
+    parser.add_argument("--in-cluster", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(
+        K8SManager(namespace=args.namespace, in_cluster=args.in_cluster),
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import itertools
+import threading
+import time
+
+import urllib3
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.logger import logger
+from polyaxon_k8s.quantities import parse_quantity
+from polyaxon_k8s.resilience import Watch, get_watch_error_code
+
+RESOURCE_QUOTAS = "resource_quota"
+LIMIT_RANGES = "limit_range"
+
+# Compute resources a quota can limit without the `requests.` prefix
+STANDARD_RESOURCES = ("cpu", "memory", "ephemeral-storage")
+
+
+def _get(obj, attr, key=None):
+    """Reads a field of a model, or of a dict with the api's camelCase keys."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key or attr)
+    return getattr(obj, attr, None)
+
+
+def get_pod_spec(kind, body):
+    spec = _get(body, "spec")
+    if kind == constants.K8S_JOB_KIND:
+        spec = _get(_get(spec, "template"), "spec")
+    return spec
+
+
+def get_pods_count(kind, body):
+    """Returns the number of pods a workload runs at once."""
+    if kind != constants.K8S_JOB_KIND:
+        return 1
+    spec = _get(body, "spec")
+    parallelism = _get(spec, "parallelism")
+    completions = _get(spec, "completions")
+    if parallelism is None:
+        parallelism = 1
+    if completions is not None:
+        return min(parallelism, completions)
+    return parallelism
+
+
+def get_container_resources(container):
+    """Returns the requests and limits of a container as dicts of floats."""
+    resources = _get(container, "resources")
+    requests = _get(resources, "requests") or {}
+    limits = _get(resources, "limits") or {}
+    requests = {k: parse_quantity(v) for k, v in requests.items()}
+    limits = {k: parse_quantity(v) for k, v in limits.items()}
+    # The apiserver defaults missing requests to the limits
+    for resource, value in limits.items():
+        requests.setdefault(resource, value)
+    return requests, limits
+
+
+def set_container_defaults(container, default_requests, default_limits):
+    """Sets the missing requests and limits of a container, as the apiserver does.
+
+    The apiserver defaults missing requests to the container's own limits
+    before the LimitRanger applies the LimitRange defaults.
+    """
+    resources = _get(container, "resources")
+    requests = dict(_get(resources, "requests") or {})
+    limits = dict(_get(resources, "limits") or {})
+    for resource, value in limits.items():
+        requests.setdefault(resource, value)
+    for resource, value in (default_limits or {}).items():
+        limits.setdefault(resource, value)
+    for resource, value in (default_requests or {}).items():
+        requests.setdefault(resource, value)
+    if isinstance(container, dict):
+        container["resources"] = dict(
+            container.get("resources") or {}, requests=requests, limits=limits
+        )
+    elif resources is None:
+        container.resources = client.V1ResourceRequirements(
+            requests=requests, limits=limits
+        )
+    else:
+        resources.requests = requests
+        resources.limits = limits
+
+
+def get_pod_resources(containers, init_containers):
+    """Returns the effective requests and limits of a pod.
+
+    Containers run together and init containers one at a time,
+    so a pod needs the max of the containers' sum and of every init container.
+    """
+    requests = {}
+    limits = {}
+    for container in containers:
+        container_requests, container_limits = get_container_resources(container)
+        for resource, value in container_requests.items():
+            requests[resource] = requests.get(resource, 0) + value
+        for resource, value in container_limits.items():
+            limits[resource] = limits.get(resource, 0) + value
+    for container in init_containers:
+        container_requests, container_limits = get_container_resources(container)
+        for resource, value in container_requests.items():
+            requests[resource] = max(requests.get(resource, 0), value)
+        for resource, value in container_limits.items():
+            limits[resource] = max(limits.get(resource, 0), value)
+    return requests, limits
+
+
+def check_limit_range_item(item, requests, limits):
+    """Returns the violations of a `Container` or `Pod` LimitRange item."""
+    errors = []
+    for resource, value in (item.max or {}).items():
+        value = parse_quantity(value)
+        if resource not in limits:
+            errors.append("no {} limit, max: {}".format(resource, value))
+        elif limits[resource] > value:
+            errors.append(
+                "{} limit {} > max {}".format(resource, limits[resource], value)
+            )
+    for resource, value in (item.min or {}).items():
+        value = parse_quantity(value)
+        if resource not in requests:
+            errors.append("no {} request, min: {}".format(resource, value))
+        elif requests[resource] < value:
+            errors.append(
+                "{} request {} < min {}".format(resource, requests[resource], value)
+            )
+    for resource, value in (item.max_limit_request_ratio or {}).items():
+        value = parse_quantity(value)
+        if requests.get(resource) and limits.get(resource):
+            ratio = limits[resource] / requests[resource]
+            if ratio > value:
+                errors.append(
+                    "{} limit/request ratio {} > max {}".format(resource, ratio, value)
+                )
+    return errors
+
+
+def get_quota_usage(kind, requests, limits, pods):
+    """Returns the usage, by quota resource name, of `pods` pods of a workload."""
+    usage = {"pods": pods, "count/pods": pods}
+    if kind == constants.K8S_JOB_KIND:
+        usage["count/jobs.batch"] = 1
+    for resource, value in requests.items():
+        usage["requests.{}".format(resource)] = value * pods
+        if resource in STANDARD_RESOURCES:
+            usage[resource] = value * pods
+    for resource, value in limits.items():
+        usage["limits.{}".format(resource)] = value * pods
+    return usage
+
+
+def is_newer(resource_version, other):
+    """Resource versions are opaque, but are ordered etcd revisions in practice."""
+    try:
+        return int(resource_version) > int(other)
+    except (TypeError, ValueError):
+        return False
+
+
+class Reservation(object):
+    """Quota usage of a launch, counted locally until the apiserver reports it."""
+
+    __slots__ = (
+        "id",
+        "kind",
+        "namespace",
+        "usage",
+        "created_at",
+        "confirmed_at",
+        "resource_version",
+    )
+
+    def __init__(self, reservation_id, kind, namespace, usage):
+        self.id = reservation_id
+        self.kind = kind
+        self.namespace = namespace
+        self.usage = usage
+        self.created_at = time.time()
+        self.confirmed_at = None
+        self.resource_version = None
+
+    def is_expired(self, now, reservation_ttl):
+        # Unconfirmed reservations expire as well, in case they are never released
+        return now - (self.confirmed_at or self.created_at) > reservation_ttl
+
+    def is_reported_by(self, quota):
+        """Returns True if the quota's status includes the launch.
+
+        The quota is updated at admission, before the pod is stored, so
+        any later update of the quota counts the pod. A job's pods are created
+        later by the job controller, so jobs are only released by the ttl.
+        """
+        return (
+            self.kind == constants.K8S_POD_KIND
+            and self.confirmed_at is not None
+            and is_newer(quota.metadata.resource_version, self.resource_version)
+        )
+
+
+class NamespaceView(object):
+    """ResourceQuotas, LimitRanges and reservations of a namespace."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.objects = {RESOURCE_QUOTAS: {}, LIMIT_RANGES: {}}
+        self.resource_versions = {RESOURCE_QUOTAS: None, LIMIT_RANGES: None}
+        self.reservations = {}
+        self.stop_event = threading.Event()
+
+    @property
+    def is_synced(self):
+        return all(v is not None for v in self.resource_versions.values())
+
+    @property
+    def quotas(self):
+        # Scoped quotas only apply to some pods, the apiserver remains the judge
+        return [
+            q
+            for q in self.objects[RESOURCE_QUOTAS].values()
+            if not (q.spec and (q.spec.scopes or q.spec.scope_selector))
+        ]
+
+    @property
+    def limit_items(self):
+        return [
+            item
+            for limit_range in self.objects[LIMIT_RANGES].values()
+            for item in (limit_range.spec.limits if limit_range.spec else None) or []
+        ]
+
+    def get_reserved(self, resource, reservation_ttl):
+        now = time.time()
+        for reservation_id, reservation in list(self.reservations.items()):
+            if reservation.is_expired(now, reservation_ttl):
+                del self.reservations[reservation_id]
+        return sum(r.usage.get(resource, 0) for r in self.reservations.values())
+
+
+class AdmissionController(object):
+    """Checks launches against the namespace's ResourceQuotas and LimitRanges locally.
+
+    Quotas and LimitRanges are listed once per namespace and then kept up to
+    date with watches. Before a pod or a job is created, the LimitRange defaults
+    are applied to its containers and its requests are checked, launches that
+    cannot be admitted are refused without a round trip, with an `ApiException`
+    403 whose reason contains `refused by local admission`. Only the job object
+    itself is counted against the quotas, the job controller creates as many
+    of its pods as the quotas allow, but the usage of its pods is reserved.
+    Launches that exceed the remaining quota wait up to `queue_timeout` seconds
+    for usage to be released.
+
+    The usage of admitted pods is reserved until a quota update newer than
+    the pod is observed, and the usage of jobs, or of launches that are never
+    confirmed nor released, for `reservation_ttl` seconds.
+    Scoped quotas are not evaluated, and nothing is checked until
+    a namespace's quotas and LimitRanges are synced.
+    """
+
+    def __init__(
+        self,
+        manager,
+        queue_timeout=constants.ADMISSION_QUEUE_TIMEOUT,
+        reservation_ttl=constants.ADMISSION_RESERVATION_TTL,
+        watch_timeout=constants.ADMISSION_WATCH_TIMEOUT,
+    ):
+        self.manager = manager
+        self.queue_timeout = queue_timeout
+        self.reservation_ttl = reservation_ttl
+        self.watch_timeout = watch_timeout
+        self._views = {}
+        self._ids = itertools.count()
+        self._condition = threading.Condition()
+
+    def stop(self):
+        with self._condition:
+            for view in self._views.values():
+                view.stop_event.set()
+            self._views = {}
+            self._condition.notify_all()
+
+    def _get_view(self, namespace):
+        with self._condition:
+            view = self._views.get(namespace)
+            if view is not None:
+                return view
+            view = NamespaceView(namespace)
+            self._views[namespace] = view
+        for resource in (RESOURCE_QUOTAS, LIMIT_RANGES):
+            try:
+                self._list(view, resource)
+            except ApiException as e:
+                logger.warning(
+                    "Admission is not checked until `{}` {}s are synced: {}".format(
+                        namespace, resource, e
+                    )
+                )
+            thread = threading.Thread(target=self._run, args=(view, resource))
+            thread.daemon = True
+            thread.start()
+        return view
+
+    def _get_list_call(self, resource):
+        return getattr(self.manager.k8s_api, "list_namespaced_{}".format(resource))
+
+    def _list(self, view, resource):
+        resp = self.manager._call(
+            self._get_list_call(resource), idempotent=True, namespace=view.namespace
+        )
+        with self._condition:
+            view.objects[resource] = {obj.metadata.name: obj for obj in resp.items}
+            view.resource_versions[resource] = resp.metadata.resource_version
+            self._condition.notify_all()
+
+    def handle_event(self, view, resource, event_type, obj):
+        with self._condition:
+            view.resource_versions[resource] = obj.metadata.resource_version
+            if event_type == "DELETED":
+                view.objects[resource].pop(obj.metadata.name, None)
+            else:
+                view.objects[resource][obj.metadata.name] = obj
+            if resource == RESOURCE_QUOTAS and event_type != "DELETED":
+                for reservation_id, reservation in list(view.reservations.items()):
+                    if reservation.is_reported_by(obj):
+                        del view.reservations[reservation_id]
+            self._condition.notify_all()
+
+    def _watch(self, view, resource):
+        if view.resource_versions[resource] is None:
+            self._list(view, resource)
+        stream = Watch().stream(
+            self._get_list_call(resource),
+            namespace=view.namespace,
+            resource_version=view.resource_versions[resource],
+            timeout_seconds=self.watch_timeout,
+        )
+        for event in stream:
+            if view.stop_event.is_set():
+                return
+            if event["type"] == "ERROR":
+                # E.g. the resource version is too old, relist
+                logger.warning(
+                    "Admission {} watch error {}, relisting".format(
+                        resource, get_watch_error_code(event)
+                    )
+                )
+                view.resource_versions[resource] = None
+                return
+            self.handle_event(view, resource, event["type"], event["object"])
+
+    def _run(self, view, resource):
+        while not view.stop_event.is_set():
+            try:
+                self._watch(view, resource)
+            except (ApiException, urllib3.exceptions.HTTPError, ValueError) as e:
+                # ValueError: an object the client could not deserialize
+                logger.error("K8S error: {}".format(e))
+                view.resource_versions[resource] = None
+                view.stop_event.wait(constants.ADMISSION_RETRY_PERIOD)
+
+    def _refuse(self, kind, errors):
+        return ApiException(
+            status=403,
+            reason="{} refused by local admission: {}".format(kind, "; ".join(errors)),
+        )
+
+    def _check_limit_ranges(self, view, containers, init_containers):
+        errors = []
+        for item in view.limit_items:
+            if item.type == constants.K8S_LIMIT_TYPE_CONTAINER:
+                for container in containers + init_containers:
+                    requests, limits = get_container_resources(container)
+                    errors += check_limit_range_item(item, requests, limits)
+            elif item.type == constants.K8S_LIMIT_TYPE_POD:
+                requests, limits = get_pod_resources(containers, init_containers)
+                errors += check_limit_range_item(item, requests, limits)
+        return errors
+
+    def _check_quotas(self, view, usage, containers):
+        """Returns the quota errors that no release can fix, and the exceeded ones."""
+        containers_resources = [get_container_resources(c) for c in containers]
+        errors = []
+        exceeded = []
+        for quota in view.quotas:
+            status = quota.status
+            hard = (status.hard if status else None) or quota.spec.hard or {}
+            used = (status.used if status else None) or {}
+            for resource, value in hard.items():
+                # Quotas on compute resources require every container to set them
+                kind, _, name = resource.rpartition(".")
+                if name in STANDARD_RESOURCES and kind in ("", "requests", "limits"):
+                    index = 1 if kind == "limits" else 0
+                    if not all(name in r[index] for r in containers_resources):
+                        errors.append(
+                            "quota `{}` requires a {} for every container".format(
+                                quota.metadata.name, resource
+                            )
+                        )
+                        continue
+                if resource not in usage:
+                    continue
+                value = parse_quantity(value)
+                if usage[resource] > value:
+                    errors.append(
+                        "quota `{}` {}: requested {} > hard {}".format(
+                            quota.metadata.name, resource, usage[resource], value
+                        )
+                    )
+                    continue
+                in_use = parse_quantity(used.get(resource, 0)) + view.get_reserved(
+                    resource, self.reservation_ttl
+                )
+                if in_use + usage[resource] > value:
+                    exceeded.append(
+                        "quota `{}` {}: requested {}, used {}, hard {}".format(
+                            quota.metadata.name,
+                            resource,
+                            usage[resource],
+                            in_use,
+                            value,
+                        )
+                    )
+        return errors, exceeded
+
+    def admit(self, kind, body, namespace, queue_timeout=None):
+        """Applies the LimitRange defaults to `body` and reserves its quota usage.
+
+        Raises `ApiException(403)` if the launch cannot be admitted, returns
+        a reservation to `confirm` or `release` once the launch is submitted.
+        """
+        view = self._get_view(namespace)
+        spec = get_pod_spec(kind, body)
+        containers = list(_get(spec, "containers") or [])
+        init_containers = list(_get(spec, "init_containers", "initContainers") or [])
+        if queue_timeout is None:
+            queue_timeout = self.queue_timeout
+        start = time.time()
+
+        with self._condition:
+            if not view.is_synced:
+                return None
+            for item in view.limit_items:
+                if item.type == constants.K8S_LIMIT_TYPE_CONTAINER:
+                    for container in containers + init_containers:
+                        set_container_defaults(
+                            container, item.default_request, item.default
+                        )
+            errors = self._check_limit_ranges(view, containers, init_containers)
+            if errors:
+                raise self._refuse(kind, errors)
+
+            requests, limits = get_pod_resources(containers, init_containers)
+            usage = get_quota_usage(
+                kind, requests, limits, pods=get_pods_count(kind, body)
+            )
+            checked = usage
+            if kind == constants.K8S_JOB_KIND:
+                checked = {"count/jobs.batch": usage["count/jobs.batch"]}
+            while True:
+                errors, exceeded = self._check_quotas(view, checked, containers)
+                if errors:
+                    raise self._refuse(kind, errors)
+                if not exceeded:
+                    break
+                remaining = queue_timeout - (time.time() - start)
+                if remaining <= 0 or view.stop_event.is_set():
+                    raise self._refuse(kind, exceeded)
+                self._condition.wait(remaining)
+
+            reservation = Reservation(next(self._ids), kind, namespace, usage)
+            view.reservations[reservation.id] = reservation
+            return reservation
+
+    def confirm(self, reservation, obj=None):
+        """Marks the launch as accepted by the apiserver, `obj` is the created object."""
+        if reservation is None:
+            return
+        metadata = getattr(obj, "metadata", None)
+        with self._condition:
+            reservation.confirmed_at = time.time()
+            reservation.resource_version = getattr(metadata, "resource_version", None)
+
+    def release(self, reservation):
+        """Releases the usage of a launch the apiserver did not accept."""
+        if reservation is None:
+            return
+        with self._condition:
+            view = self._views.get(reservation.namespace)
+            if view is not None:
+                view.reservations.pop(reservation.id, None)
+            self._condition.notify_all()
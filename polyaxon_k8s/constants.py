@@ -5,6 +5,7 @@ K8S_API_VERSION_V1 = "v1"
 K8S_API_VERSION_NETWORKING_V1_BETA1 = "networking.k8s.io/v1beta1"
 K8S_API_VERSION_BATCH_V1 = "batch/v1"
 K8S_API_VERSION_APPS_V1 = "apps/v1"
+K8S_API_VERSION_COORDINATION_V1 = "coordination.k8s.io/v1"
 K8S_PERSISTENT_VOLUME_KIND = "PersistentVolume"
 K8S_PERSISTENT_VOLUME_CLAIM_KIND = "PersistentVolumeClaim"
 K8S_CONFIG_MAP_KIND = "ConfigMap"
@@ -15,3 +16,52 @@ K8S_DEPLOYMENT_KIND = "Deployment"
 K8S_SERVICE_KIND = "Service"
 K8S_INGRESS_KIND = "Ingress"
 K8S_JOB_KIND = "Job"
+K8S_LEASE_KIND = "Lease"
+K8S_LIMIT_TYPE_CONTAINER = "Container"
+K8S_LIMIT_TYPE_POD = "Pod"
+K8S_METRICS_GROUP = "metrics.k8s.io"
+K8S_METRICS_VERSION = "v1beta1"
+
+K8S_METADATA_LIST_ACCEPT = (
+    "application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io,"
+    "application/json;as=PartialObjectMetadataList;v=v1beta1;g=meta.k8s.io,"
+    "application/json"
+)
+K8S_ACTIVE_POD_FIELD_SELECTOR = "status.phase!=Succeeded,status.phase!=Failed"
+K8S_FINISHED_POD_FIELD_SELECTOR = (
+    "status.phase!=Pending,status.phase!=Running,status.phase!=Unknown"
+)
+
+REQUEST_CONNECT_TIMEOUT_SHARE = 0.25
+HEDGE_MIN_SAMPLES = 20
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = 30
+
+LEASE_DURATION = 15
+LEASE_RETRY_PERIOD = 5
+LEASE_RENEW_DEADLINE = 10
+LABEL_SHARD_GROUP = "polyaxon.com/shard-group"
+
+REAPER_TTL = 3600
+REAPER_INTERVAL = 60
+REAPER_BATCH_SIZE = 20
+REAPER_RATE = 10
+
+EVENTS_HISTORY_SIZE = 50
+EVENTS_MAX_OBJECTS = 1000
+EVENTS_WATCH_TIMEOUT = 60
+EVENTS_RETRY_PERIOD = 5
+
+USAGE_INTERVAL = 15
+USAGE_WINDOW = 240
+USAGE_MAX_IDLE = 4
+
+TRANSFER_CHUNK_SIZE = 48 * 1024
+TRANSFER_READ_TIMEOUT = 1
+TRANSFER_STDERR_SIZE = 4096
+TRANSFER_MAX_WORKERS = 8
+
+ADMISSION_QUEUE_TIMEOUT = 0
+ADMISSION_RESERVATION_TTL = 30
+ADMISSION_WATCH_TIMEOUT = 60
+ADMISSION_RETRY_PERIOD = 5
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import bisect
+import datetime
+import hashlib
+import socket
+import time
+
+from dateutil.tz import tzutc
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.logger import logger
+from polyaxon_k8s.runner import PeriodicRunner
+
+
+def get_identity():
+    return socket.gethostname().lower()
+
+
+def get_metadata_value(obj, key):
+    """Returns a metadata field of a model or of a raw (custom) object."""
+    if isinstance(obj, dict):
+        return (obj.get("metadata") or {}).get(key)
+    return getattr(obj.metadata, key, None)
+
+
+def _now():
+    return datetime.datetime.now(tzutc())
+
+
+def _is_expired(spec, now):
+    if not spec.renew_time or not spec.lease_duration_seconds:
+        return True
+    expires_at = spec.renew_time + datetime.timedelta(
+        seconds=spec.lease_duration_seconds
+    )
+    return expires_at < now
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hash ring, every member is placed on the ring `replicas` times.
+
+    Adding or removing a member only moves the keys of the arcs it owns.
+    """
+
+    def __init__(self, members=(), replicas=100):
+        self.replicas = replicas
+        self.members = frozenset()
+        self._hashes = []
+        self._owners = []
+        self.set_members(members)
+
+    def set_members(self, members):
+        members = frozenset(members)
+        if members == self.members:
+            return False
+        points = sorted(
+            (_hash("{}-{}".format(member, i)), member)
+            for member in members
+            for i in range(self.replicas)
+        )
+        self._hashes = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+        self.members = members
+        return True
+
+    def get_member(self, key):
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class LeaderElector(PeriodicRunner):
+    """Single leader election on a `coordination.k8s.io` Lease.
+
+    Updates carry the lease's resourceVersion, so concurrent candidates
+    conflict instead of both acquiring the lease.
+
+    `is_leader` turns False once the lease was not renewed for `renew_deadline`
+    seconds, e.g. while a renew hangs, before other candidates can acquire it
+    after `lease_duration`. Lease calls time out within the deadline.
+    """
+
+    def __init__(
+        self,
+        manager,
+        name,
+        identity=None,
+        lease_duration=constants.LEASE_DURATION,
+        renew_deadline=constants.LEASE_RENEW_DEADLINE,
+        retry_period=constants.LEASE_RETRY_PERIOD,
+        on_started_leading=None,
+        on_stopped_leading=None,
+    ):
+        super(LeaderElector, self).__init__(interval=retry_period)
+        self.manager = manager
+        self.name = name
+        self.identity = identity or get_identity()
+        self.lease_duration = lease_duration
+        self.renew_deadline = min(renew_deadline, lease_duration)
+        self.on_started_leading = on_started_leading
+        self.on_stopped_leading = on_stopped_leading
+        self._is_leader = False
+        self._renewed_at = None
+
+    @property
+    def request_timeout(self):
+        # A renew is a read and an update
+        return self.renew_deadline / 2
+
+    @property
+    def is_leader(self):
+        """True only while the last renew is within the deadline, e.g. not hanging."""
+        return self._is_leader and not self._is_renew_expired()
+
+    def _is_renew_expired(self):
+        return (
+            self._renewed_at is None
+            or time.time() - self._renewed_at > self.renew_deadline
+        )
+
+    def try_acquire_or_renew(self):
+        now = _now()
+        lease = self.manager.get_lease(self.name, request_timeout=self.request_timeout)
+        if lease is None:
+            body = client.V1Lease(
+                api_version=constants.K8S_API_VERSION_COORDINATION_V1,
+                kind=constants.K8S_LEASE_KIND,
+                metadata=client.V1ObjectMeta(name=self.name),
+                spec=client.V1LeaseSpec(
+                    holder_identity=self.identity,
+                    lease_duration_seconds=self.lease_duration,
+                    acquire_time=now,
+                    renew_time=now,
+                    lease_transitions=0,
+                ),
+            )
+            try:
+                self.manager.create_lease(
+                    name=self.name, body=body, request_timeout=self.request_timeout
+                )
+                return True
+            except ApiException:
+                return False
+
+        spec = lease.spec
+        if spec.holder_identity != self.identity:
+            if spec.holder_identity and not _is_expired(spec, now):
+                return False
+            spec.holder_identity = self.identity
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.renew_time = now
+        spec.lease_duration_seconds = self.lease_duration
+        try:
+            self.manager.update_lease(
+                name=self.name, body=lease, request_timeout=self.request_timeout
+            )
+            return True
+        except ApiException:
+            return False
+
+    def _set_leader(self, is_leader):
+        if is_leader == self._is_leader:
+            return
+        self._is_leader = is_leader
+        logger.info(
+            "`{}` {} leading `{}`".format(
+                self.identity, "started" if is_leader else "stopped", self.name
+            )
+        )
+        callback = self.on_started_leading if is_leader else self.on_stopped_leading
+        if callback:
+            callback()
+
+    def tick(self):
+        if self._is_leader and self._is_renew_expired():
+            self._set_leader(False)
+        start = time.time()
+        if self.try_acquire_or_renew():
+            # The lease may expire from when the renew was sent
+            self._renewed_at = start
+            self._set_leader(True)
+        else:
+            self._set_leader(False)
+
+    def release(self):
+        lease = self.manager.get_lease(self.name, request_timeout=self.request_timeout)
+        if lease is None or lease.spec.holder_identity != self.identity:
+            return
+        lease.spec.holder_identity = ""
+        lease.spec.lease_duration_seconds = 1
+        try:
+            self.manager.update_lease(
+                name=self.name, body=lease, request_timeout=self.request_timeout
+            )
+        except ApiException as e:
+            logger.debug("Lease `{}` was not released: {}".format(self.name, e))
+
+    def on_stop(self):
+        if self._is_leader:
+            self.release()
+        self._set_leader(False)
+        self._renewed_at = None
+
+
+class ShardCoordinator(PeriodicRunner):
+    """Shards objects across the live replicas of a group.
+
+    Every replica renews its own member Lease labelled with the group,
+    and builds a consistent hash ring from the members whose Lease has not
+    expired. Objects are assigned by the value of `shard_label`,
+    or by their uid if no label is given, so that all objects
+    of an experiment can be kept on the same replica.
+    """
+
+    def __init__(
+        self,
+        manager,
+        group,
+        identity=None,
+        shard_label=None,
+        lease_duration=constants.LEASE_DURATION,
+        retry_period=constants.LEASE_RETRY_PERIOD,
+        on_rebalance=None,
+    ):
+        super(ShardCoordinator, self).__init__(interval=retry_period)
+        self.manager = manager
+        self.group = group
+        self.identity = identity or get_identity()
+        self.shard_label = shard_label
+        self.lease_duration = lease_duration
+        self.on_rebalance = on_rebalance
+        self.ring = HashRing()
+        self._joined = False
+
+    @property
+    def lease_name(self):
+        return "{}-{}".format(self.group, self.identity)
+
+    @property
+    def lease_labels(self):
+        return {constants.LABEL_SHARD_GROUP: self.group}
+
+    @property
+    def members(self):
+        return self.ring.members
+
+    def heartbeat(self):
+        now = _now()
+        body = client.V1Lease(
+            api_version=constants.K8S_API_VERSION_COORDINATION_V1,
+            kind=constants.K8S_LEASE_KIND,
+            metadata=client.V1ObjectMeta(
+                name=self.lease_name, labels=self.lease_labels
+            ),
+            spec=client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=self.lease_duration,
+                renew_time=now,
+            ),
+        )
+        if self._joined:
+            try:
+                self.manager.update_lease(name=self.lease_name, body=body)
+                return
+            except ApiException:
+                pass
+        self.manager.create_or_update_lease(
+            name=self.lease_name, body=body, reraise=True
+        )
+        self._joined = True
+
+    def refresh_members(self):
+        now = _now()
+        labels = "{}={}".format(constants.LABEL_SHARD_GROUP, self.group)
+        leases = self.manager.list_leases(labels=labels, reraise=True)
+        members = [
+            lease.spec.holder_identity
+            for lease in leases
+            if lease.spec.holder_identity and not _is_expired(lease.spec, now)
+        ]
+        if self.ring.set_members(members):
+            logger.info(
+                "Shard group `{}` rebalanced over {} members".format(
+                    self.group, len(self.ring.members)
+                )
+            )
+            if self.on_rebalance:
+                self.on_rebalance(self.ring.members)
+
+    def tick(self):
+        self.heartbeat()
+        self.refresh_members()
+
+    def get_shard_key(self, obj):
+        if self.shard_label:
+            labels = get_metadata_value(obj, "labels") or {}
+            key = labels.get(self.shard_label)
+            if key:
+                return key
+        return get_metadata_value(obj, "uid")
+
+    def owns(self, obj):
+        key = self.get_shard_key(obj)
+        if key is None:
+            return False
+        return self.ring.get_member(key) == self.identity
+
+    def on_stop(self):
+        self.manager.delete_lease(self.lease_name)
+        self._joined = False
+        self.ring.set_members(())
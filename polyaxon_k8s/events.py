@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import itertools
+import threading
+
+from collections import OrderedDict, deque
+
+import urllib3
+
+from kubernetes.client.rest import ApiException
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.logger import logger
+from polyaxon_k8s.resilience import LRUCache, Watch, get_watch_error_code
+
+
+class CompactedEvent(object):
+    """Repeated events of an object with the same reason and message.
+
+    The apiserver already aggregates repeated events into a single Event with
+    a count, so counts are tracked per Event name to avoid counting updates twice.
+    """
+
+    __slots__ = ("type", "reason", "message", "first_seen", "last_seen", "_counts")
+
+    def __init__(self, event):
+        self.type = event.type
+        self.reason = event.reason
+        self.message = event.message
+        self.first_seen = event.first_timestamp or event.metadata.creation_timestamp
+        self.last_seen = self.first_seen
+        self._counts = {}
+
+    @property
+    def key(self):
+        return self.reason, self.message
+
+    @property
+    def count(self):
+        return sum(self._counts.values())
+
+    def update(self, event):
+        self.type = event.type
+        self._counts[event.metadata.name] = event.count or 1
+        last_seen = event.last_timestamp or event.metadata.creation_timestamp
+        if last_seen and (not self.last_seen or last_seen > self.last_seen):
+            self.last_seen = last_seen
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "reason": self.reason,
+            "message": self.message,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class EventHistory(object):
+    """Bounded ring buffer of the compacted events of an object."""
+
+    def __init__(self, size):
+        self._events = deque(maxlen=size)
+
+    def add(self, event):
+        key = (event.reason, event.message)
+        for compacted in self._events:
+            if compacted.key == key:
+                self._events.remove(compacted)
+                break
+        else:
+            compacted = CompactedEvent(event)
+        compacted.update(event)
+        self._events.append(compacted)
+        return compacted
+
+    def to_list(self):
+        return [e.to_dict() for e in self._events]
+
+
+class EventSubscription(object):
+    def __init__(self, callback, uid=None, labels=None):
+        self.callback = callback
+        self.uid = uid
+        self.labels = labels or {}
+
+    def matches(self, uid, get_labels):
+        if self.uid and self.uid != uid:
+            return False
+        if self.labels:
+            labels = get_labels()
+            return all(labels.get(k) == v for k, v in self.labels.items())
+        return True
+
+
+class EventStream(object):
+    """Shares a single watch on the namespace's events between many subscribers.
+
+    Events are compacted by object, reason and message, and the last
+    `history_size` compacted events of up to `max_objects` objects are kept.
+    Subscribers filter by involved object uid and/or labels, and are called with
+    `(uid, compacted_event)`.
+    """
+
+    def __init__(
+        self,
+        manager,
+        history_size=constants.EVENTS_HISTORY_SIZE,
+        max_objects=constants.EVENTS_MAX_OBJECTS,
+        watch_timeout=constants.EVENTS_WATCH_TIMEOUT,
+    ):
+        self.manager = manager
+        self.history_size = history_size
+        self.max_objects = max_objects
+        self.watch_timeout = watch_timeout
+        self.resource_version = None
+        self._histories = OrderedDict()
+        self._labels = LRUCache(maxsize=max_objects)
+        self._subscriptions = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stop_event = None
+
+    def subscribe(self, callback, uid=None, labels=None):
+        """Subscribes to the events of an object uid and/or of objects with labels.
+
+        Returns a subscription id to pass to `unsubscribe`.
+        """
+        subscription_id = next(self._ids)
+        with self._lock:
+            self._subscriptions[subscription_id] = EventSubscription(
+                callback=callback, uid=uid, labels=labels
+            )
+            if self._stop_event is None:
+                self._stop_event = threading.Event()
+                thread = threading.Thread(target=self._run, args=(self._stop_event,))
+                thread.daemon = True
+                thread.start()
+        return subscription_id
+
+    def unsubscribe(self, subscription_id):
+        """Removes a subscription, the watch stops with the last subscriber."""
+        with self._lock:
+            self._subscriptions.pop(subscription_id, None)
+            if not self._subscriptions and self._stop_event is not None:
+                self._stop_event.set()
+                self._stop_event = None
+
+    def get_history(self, uid):
+        with self._lock:
+            history = self._histories.get(uid)
+            return history.to_list() if history else []
+
+    def _get_object_labels(self, involved_object):
+        labels = self._labels.get(involved_object.uid)
+        if labels is not None:
+            return labels
+        if involved_object.kind == constants.K8S_POD_KIND:
+            obj = self.manager.get_pod(involved_object.name)
+        elif involved_object.kind == constants.K8S_JOB_KIND:
+            obj = self.manager.get_job(involved_object.name)
+        else:
+            obj = None
+        labels = (obj.metadata.labels if obj else None) or {}
+        self._labels.set(involved_object.uid, labels)
+        return labels
+
+    def handle_event(self, event):
+        involved_object = event.involved_object
+        uid = involved_object.uid
+        with self._lock:
+            history = self._histories.pop(uid, None) or EventHistory(self.history_size)
+            self._histories[uid] = history
+            while len(self._histories) > self.max_objects:
+                self._histories.popitem(last=False)
+            compacted = history.add(event)
+            subscriptions = list(self._subscriptions.values())
+
+        def get_labels():
+            return self._get_object_labels(involved_object)
+
+        for subscription in subscriptions:
+            if not subscription.matches(uid, get_labels):
+                continue
+            try:
+                subscription.callback(uid, compacted)
+            except Exception as e:
+                logger.warning("Event subscriber failed: {}".format(e))
+
+    def _watch(self, stop_event):
+        kwargs = {"timeout_seconds": self.watch_timeout}
+        if self.resource_version:
+            kwargs["resource_version"] = self.resource_version
+        stream = Watch().stream(
+            self.manager.k8s_api.list_namespaced_event,
+            namespace=self.manager.namespace,
+            **kwargs
+        )
+        for event in stream:
+            if stop_event.is_set():
+                return
+            if event["type"] == "ERROR":
+                # E.g. the resource version is too old, restart from the current state
+                logger.warning(
+                    "Events watch error {}, restarting".format(
+                        get_watch_error_code(event)
+                    )
+                )
+                self.resource_version = None
+                return
+            self.resource_version = event["object"].metadata.resource_version
+            if event["type"] in ("ADDED", "MODIFIED"):
+                self.handle_event(event["object"])
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                self._watch(stop_event)
+            except (ApiException, urllib3.exceptions.HTTPError, ValueError) as e:
+                # ValueError: an object the client could not deserialize
+                logger.error("K8S error: {}".format(e))
+                if isinstance(e, ValueError) or getattr(e, "status", None) == 410:
+                    self.resource_version = None
+                stop_event.wait(constants.EVENTS_RETRY_PERIOD)
@@ -1,16 +1,46 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import json
+import os
+import time
+
+import urllib3
+
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 
 from polyaxon_k8s import constants
+from polyaxon_k8s.admission import AdmissionController
+from polyaxon_k8s.events import EventStream
 from polyaxon_k8s.exceptions import PolyaxonK8SError
 from polyaxon_k8s.logger import logger
+from polyaxon_k8s.reaper import Reaper
+from polyaxon_k8s.resilience import (
+    CircuitBreaker,
+    LatencyTracker,
+    LRUCache,
+    Watch,
+    hedged_call,
+    is_server_failure,
+    to_api_exception,
+    to_request_timeout,
+)
+from polyaxon_k8s.transfer import copy_from_pod, copy_to_pod, run_transfers
+from polyaxon_k8s.usage import UsageSampler
 
 
 class K8SManager(object):
-    def __init__(self, k8s_config=None, namespace="default", in_cluster=False):
+    def __init__(
+        self,
+        k8s_config=None,
+        namespace="default",
+        in_cluster=False,
+        request_timeout=None,
+        hedge_reads=False,
+        circuit_breaker=False,
+        stale_cache_size=0,
+    ):
         if not k8s_config:
             if in_cluster:
                 config.load_incluster_config()
@@ -24,37 +54,292 @@ class K8SManager(object):
         self.k8s_batch_api = client.BatchV1Api(api_client)
         self.k8s_apps_api = client.AppsV1Api(api_client)
         self.networking_v1_beta1_api = client.NetworkingV1beta1Api(api_client)
-        self.k8s_custom_object_api = client.CustomObjectsApi()
+        self.k8s_custom_object_api = client.CustomObjectsApi(api_client)
         self.k8s_version_api = client.VersionApi(api_client)
+        self.k8s_coordination_api = client.CoordinationV1Api(api_client)
         self.namespace = namespace
         self.in_cluster = in_cluster
+        self.request_timeout = request_timeout
+        self.hedge_reads = hedge_reads
+        self.circuit_breaker = circuit_breaker
+        self._circuit_breakers = {}
+        self._latency_trackers = {}
+        self._stale_cache = LRUCache(stale_cache_size) if stale_cache_size else None
+        self.shard = None
+        self.reaper = None
+        self.usage_sampler = None
+        self.admission = None
+        self._event_stream = None
+
+    def _get_circuit_breaker(self, api_group):
+        if not self.circuit_breaker:
+            return None
+        breaker = self._circuit_breakers.get(api_group)
+        if breaker is None:
+            breaker = self._circuit_breakers.setdefault(
+                api_group,
+                CircuitBreaker(
+                    failure_threshold=constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                    recovery_timeout=constants.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+                ),
+            )
+        return breaker
+
+    def _get_latency_tracker(self, api_group, api_call_name):
+        # Reads of a single object and lists have very different latencies
+        key = (api_group, api_call_name)
+        tracker = self._latency_trackers.get(key)
+        if tracker is None:
+            tracker = self._latency_trackers.setdefault(key, LatencyTracker())
+        return tracker
+
+    def _call(self, api_call, idempotent=False, request_timeout=None, **kwargs):
+        """Calls the apiserver with a deadline, hedging and a circuit breaker.
+
+        `request_timeout` overrides the manager's deadline for this call.
+        Only idempotent calls are hedged, and served from the stale cache
+        when the circuit of their api group is open.
+        Transport errors, e.g. timeouts, are raised as `ApiException`.
+        """
+        api_group = type(api_call.__self__).__name__
+        breaker = self._get_circuit_breaker(api_group)
+        cache_key = None
+        if idempotent and self._stale_cache is not None:
+            cache_key = (api_group, api_call.__name__, tuple(sorted(kwargs.items())))
+
+        if breaker and not breaker.allow():
+            cached = self._stale_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                logger.warning(
+                    "K8S circuit `{}` is open, serving a cached read".format(api_group)
+                )
+                return cached
+            raise ApiException(
+                status=503, reason="K8S circuit `{}` is open".format(api_group)
+            )
+
+        if request_timeout is None:
+            request_timeout = self.request_timeout
+        if request_timeout is not None:
+            kwargs.setdefault("_request_timeout", to_request_timeout(request_timeout))
+        tracker = self._get_latency_tracker(api_group, api_call.__name__)
+        try:
+            if (
+                idempotent
+                and self.hedge_reads
+                and len(tracker) >= constants.HEDGE_MIN_SAMPLES
+            ):
+                # The first attempts are observed, slow and failed ones included,
+                # so that the hedges' faster replies do not drag the delay down
+                resp = hedged_call(
+                    api_call,
+                    delay=tracker.percentile(0.95),
+                    observe=tracker.observe,
+                    **kwargs
+                )
+            else:
+                start = time.time()
+                try:
+                    resp = api_call(**kwargs)
+                finally:
+                    tracker.observe(time.time() - start)
+        except (ApiException, urllib3.exceptions.HTTPError) as e:
+            e = to_api_exception(e)
+            if breaker:
+                if is_server_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            raise e
+
+        if breaker:
+            breaker.record_success()
+        if cache_key:
+            self._stale_cache.set(cache_key, resp)
+        return resp
 
     def set_namespace(self, namespace):
         self.namespace = namespace
 
-    def get_version(self, reraise=False):
+    def set_shard(self, shard):
+        """Scopes the pods, jobs and custom objects helpers to a `ShardCoordinator`."""
+        self.shard = shard
+
+    def in_shard(self, obj):
+        return self.shard is None or self.shard.owns(obj)
+
+    def start_reaper(self, experiment_label, **kwargs):
+        """Starts reaping finished experiments in the background, see `Reaper`."""
+        self.stop_reaper()
+        self.reaper = Reaper(manager=self, experiment_label=experiment_label, **kwargs)
+        self.reaper.start()
+        return self.reaper
+
+    def stop_reaper(self):
+        if self.reaper:
+            self.reaper.stop()
+            self.reaper = None
+
+    def start_usage_sampler(self, experiment_label, **kwargs):
+        """Starts sampling pods and nodes usage in the background, see `UsageSampler`."""
+        self.stop_usage_sampler()
+        self.usage_sampler = UsageSampler(
+            manager=self, experiment_label=experiment_label, **kwargs
+        )
+        self.usage_sampler.start()
+        return self.usage_sampler
+
+    def stop_usage_sampler(self):
+        if self.usage_sampler:
+            self.usage_sampler.stop()
+            self.usage_sampler = None
+
+    def start_admission(self, **kwargs):
+        """Admits pods and jobs before creating them, see `AdmissionController`."""
+        self.stop_admission()
+        self.admission = AdmissionController(manager=self, **kwargs)
+        return self.admission
+
+    def stop_admission(self):
+        if self.admission:
+            self.admission.stop()
+            self.admission = None
+
+    def _create_admitted(self, kind, body, create):
+        if not self.admission:
+            return create()
+        reservation = self.admission.admit(
+            kind=kind, body=body, namespace=self.namespace
+        )
+        try:
+            resp = create()
+        except Exception:
+            # E.g. a response that fails to deserialize, the reservation would
+            # otherwise be held until it expires
+            self.admission.release(reservation)
+            raise
+        self.admission.confirm(reservation, resp)
+        return resp
+
+    @property
+    def event_stream(self):
+        if self._event_stream is None:
+            self._event_stream = EventStream(manager=self)
+        return self._event_stream
+
+    def subscribe_events(self, callback, uid=None, labels=None):
+        """Calls `callback(uid, compacted_event)` for the events of matching objects.
+
+        All subscribers share a single watch on the namespace's events.
+        """
+        return self.event_stream.subscribe(callback=callback, uid=uid, labels=labels)
+
+    def unsubscribe_events(self, subscription_id):
+        self.event_stream.unsubscribe(subscription_id)
+
+    def get_events_history(self, uid):
+        return self.event_stream.get_history(uid)
+
+    def get_version(self, reraise=False, request_timeout=None):
         try:
-            return self.k8s_version_api.get_code().to_dict()
+            return self._call(
+                self.k8s_version_api.get_code,
+                idempotent=True,
+                request_timeout=request_timeout,
+            ).to_dict()
         except ApiException as e:
             logger.error("K8S error: {}".format(e))
             if reraise:
                 raise PolyaxonK8SError(e)
 
-    def _list_namespace_resource(self, labels, resource_api, reraise=False, **kwargs):
+    def _list_namespace_resource(
+        self,
+        labels,
+        resource_api,
+        reraise=False,
+        request_timeout=None,
+        sharded=False,
+        **kwargs
+    ):
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
         try:
-            res = resource_api(
-                namespace=self.namespace, label_selector=labels, **kwargs
+            res = self._call(
+                resource_api,
+                idempotent=True,
+                request_timeout=request_timeout,
+                namespace=self.namespace,
+                label_selector=labels,
+                **kwargs
             )
-            return [p for p in res.items]
+            items = res["items"] if isinstance(res, dict) else res.items
+            if sharded:
+                return [p for p in items if self.in_shard(p)]
+            return items
         except ApiException as e:
             logger.error("K8S error: {}".format(e))
             if reraise:
                 raise PolyaxonK8SError(e)
             return []
 
-    def list_nodes(self, reraise=False):
+    def _list_namespace_metadata(
+        self,
+        labels,
+        resource_path,
+        field_selector=None,
+        reraise=False,
+        request_timeout=None,
+    ):
+        """Lists objects as `PartialObjectMetadata` dicts.
+
+        Skips sending and decoding specs and statuses, the apiserver falls back
+        to full objects if it does not support metadata only lists.
+        """
+        query_params = [("labelSelector", labels)]
+        if field_selector:
+            query_params.append(("fieldSelector", field_selector))
         try:
-            res = self.k8s_api.list_node()
+            resp = self._call(
+                self.k8s_api.api_client.call_api,
+                request_timeout=request_timeout,
+                resource_path=resource_path,
+                method="GET",
+                path_params={"namespace": self.namespace},
+                query_params=query_params,
+                header_params={"Accept": constants.K8S_METADATA_LIST_ACCEPT},
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+                _preload_content=False,
+            )
+            return json.loads(resp.data.decode("utf-8")).get("items") or []
+        except ApiException as e:
+            logger.error("K8S error: {}".format(e))
+            if reraise:
+                raise PolyaxonK8SError(e)
+            return []
+
+    def _watch_namespace_resource(self, labels, resource_api, reraise=False, **kwargs):
+        """Yields the watch events of a resource, scoped to the current shard.
+
+        The shard is checked per event, so rebalancing applies to running watches.
+        """
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        try:
+            for event in Watch().stream(
+                resource_api, namespace=self.namespace, label_selector=labels, **kwargs
+            ):
+                # ERROR events carry a raw Status, e.g. 410 if the version expired
+                if event["type"] == "ERROR" or self.in_shard(event["object"]):
+                    yield event
+        except ApiException as e:
+            logger.error("K8S error: {}".format(e))
+            if reraise:
+                raise PolyaxonK8SError(e)
+
+    def list_nodes(self, reraise=False, request_timeout=None):
+        try:
+            res = self._call(
+                self.k8s_api.list_node, idempotent=True, request_timeout=request_timeout
+            )
             return [p for p in res.items]
         except ApiException as e:
             logger.error("K8S error: {}".format(e))
@@ -62,72 +347,194 @@ class K8SManager(object):
                 raise PolyaxonK8SError(e)
             return []
 
-    def list_pods(self, labels, include_uninitialized=True, reraise=False):
+    def list_pods(
+        self,
+        labels,
+        include_uninitialized=True,
+        field_selector=None,
+        reraise=False,
+        request_timeout=None,
+        sharded=True,
+    ):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.k8s_api.list_namespaced_pod,
             reraise=reraise,
+            request_timeout=request_timeout,
+            sharded=sharded,
             include_uninitialized=include_uninitialized,
+            field_selector=field_selector,
+        )
+
+    def list_pods_metadata(
+        self, labels, field_selector=None, reraise=False, request_timeout=None
+    ):
+        return self._list_namespace_metadata(
+            labels=labels,
+            resource_path="/api/v1/namespaces/{namespace}/pods",
+            field_selector=field_selector,
+            reraise=reraise,
+            request_timeout=request_timeout,
+        )
+
+    def list_services_metadata(self, labels, reraise=False, request_timeout=None):
+        return self._list_namespace_metadata(
+            labels=labels,
+            resource_path="/api/v1/namespaces/{namespace}/services",
+            reraise=reraise,
+            request_timeout=request_timeout,
+        )
+
+    def list_ingresses_metadata(self, labels, reraise=False, request_timeout=None):
+        return self._list_namespace_metadata(
+            labels=labels,
+            resource_path="/apis/networking.k8s.io/v1beta1/namespaces/{namespace}/ingresses",
+            reraise=reraise,
+            request_timeout=request_timeout,
         )
 
-    def list_jobs(self, labels, include_uninitialized=True, reraise=False):
+    def list_jobs(
+        self,
+        labels,
+        include_uninitialized=True,
+        reraise=False,
+        request_timeout=None,
+        sharded=True,
+    ):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.k8s_batch_api.list_namespaced_job,
             reraise=reraise,
+            request_timeout=request_timeout,
+            sharded=sharded,
             include_uninitialized=include_uninitialized,
         )
 
-    def list_custom_objects(self, labels, group, version, plural, reraise=False):
+    def list_custom_objects(
+        self,
+        labels,
+        group,
+        version,
+        plural,
+        reraise=False,
+        request_timeout=None,
+        sharded=True,
+    ):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.k8s_custom_object_api.list_namespaced_custom_object,
             reraise=reraise,
+            request_timeout=request_timeout,
+            sharded=sharded,
             group=group,
             version=version,
             plural=plural,
         )
 
-    def list_services(self, labels, reraise=False):
+    def list_cluster_custom_objects(
+        self, group, version, plural, reraise=False, request_timeout=None
+    ):
+        try:
+            res = self._call(
+                self.k8s_custom_object_api.list_cluster_custom_object,
+                idempotent=True,
+                request_timeout=request_timeout,
+                group=group,
+                version=version,
+                plural=plural,
+            )
+            return res.get("items") or []
+        except ApiException as e:
+            logger.error("K8S error: {}".format(e))
+            if reraise:
+                raise PolyaxonK8SError(e)
+            return []
+
+    def list_services(self, labels, reraise=False, request_timeout=None):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.k8s_api.list_namespaced_service,
             reraise=reraise,
+            request_timeout=request_timeout,
         )
 
-    def list_deployments(self, labels, reraise=False):
+    def list_deployments(self, labels, reraise=False, request_timeout=None):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.k8s_apps_api.list_namespaced_deployment,
             reraise=reraise,
+            request_timeout=request_timeout,
         )
 
-    def list_ingresses(self, labels, reraise=False):
+    def list_ingresses(self, labels, reraise=False, request_timeout=None):
         return self._list_namespace_resource(
             labels=labels,
             resource_api=self.networking_v1_beta1_api.list_namespaced_ingress,
             reraise=reraise,
+            request_timeout=request_timeout,
+        )
+
+    def list_leases(self, labels, reraise=False, request_timeout=None):
+        return self._list_namespace_resource(
+            labels=labels,
+            resource_api=self.k8s_coordination_api.list_namespaced_lease,
+            reraise=reraise,
+            request_timeout=request_timeout,
+        )
+
+    def watch_pods(self, labels, timeout_seconds=None, reraise=False):
+        return self._watch_namespace_resource(
+            labels=labels,
+            resource_api=self.k8s_api.list_namespaced_pod,
+            reraise=reraise,
+            timeout_seconds=timeout_seconds,
+        )
+
+    def watch_jobs(self, labels, timeout_seconds=None, reraise=False):
+        return self._watch_namespace_resource(
+            labels=labels,
+            resource_api=self.k8s_batch_api.list_namespaced_job,
+            reraise=reraise,
+            timeout_seconds=timeout_seconds,
+        )
+
+    def watch_custom_objects(
+        self, labels, group, version, plural, timeout_seconds=None, reraise=False
+    ):
+        return self._watch_namespace_resource(
+            labels=labels,
+            resource_api=self.k8s_custom_object_api.list_namespaced_custom_object,
+            reraise=reraise,
+            group=group,
+            version=version,
+            plural=plural,
+            timeout_seconds=timeout_seconds,
         )
 
     def update_node_labels(self, node, labels, reraise=False):
         body = {"metadata": {"labels": labels}, "namespace": self.namespace}
         try:
-            return self.k8s_api.patch_node(name=node, body=body)
+            return self._call(self.k8s_api.patch_node, name=node, body=body)
         except ApiException as e:
             logger.error("K8S error: {}".format(e))
             if reraise:
                 raise PolyaxonK8SError(e)
 
     def create_config_map(self, name, body):
-        resp = self.k8s_api.create_namespaced_config_map(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.create_namespaced_config_map,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Config map `{}` was created".format(name))
         return resp
 
     def update_config_map(self, name, body):
-        resp = self.k8s_api.patch_namespaced_config_map(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.patch_namespaced_config_map,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Config map `{}` was patched".format(name))
         return resp
@@ -145,15 +552,18 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_secret(self, name, body):
-        resp = self.k8s_api.create_namespaced_secret(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.create_namespaced_secret, namespace=self.namespace, body=body
         )
         logger.debug("Secret `{}` was created".format(name))
         return resp
 
     def update_secret(self, name, body):
-        resp = self.k8s_api.patch_namespaced_secret(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.patch_namespaced_secret,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Secret `{}` was patched".format(name))
         return resp
@@ -171,15 +581,18 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_service(self, name, body):
-        resp = self.k8s_api.create_namespaced_service(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.create_namespaced_service, namespace=self.namespace, body=body
         )
         logger.debug("Service `{}` was created".format(name))
         return resp
 
     def update_service(self, name, body):
-        resp = self.k8s_api.patch_namespaced_service(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.patch_namespaced_service,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Service `{}` was patched".format(name))
         return resp
@@ -197,13 +610,22 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_pod(self, name, body):
-        resp = self.k8s_api.create_namespaced_pod(namespace=self.namespace, body=body)
+        resp = self._create_admitted(
+            constants.K8S_POD_KIND,
+            body,
+            lambda: self._call(
+                self.k8s_api.create_namespaced_pod, namespace=self.namespace, body=body
+            ),
+        )
         logger.debug("Pod `{}` was created".format(name))
         return resp
 
     def update_pod(self, name, body):
-        resp = self.k8s_api.patch_namespaced_pod(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.patch_namespaced_pod,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Pod `{}` was patched".format(name))
         return resp
@@ -221,15 +643,24 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_job(self, name, body):
-        resp = self.k8s_batch_api.create_namespaced_job(
-            namespace=self.namespace, body=body
+        resp = self._create_admitted(
+            constants.K8S_JOB_KIND,
+            body,
+            lambda: self._call(
+                self.k8s_batch_api.create_namespaced_job,
+                namespace=self.namespace,
+                body=body,
+            ),
         )
         logger.debug("Job `{}` was created".format(name))
         return resp
 
     def update_job(self, name, body):
-        resp = self.k8s_batch_api.patch_namespaced_job(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_batch_api.patch_namespaced_job,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Job `{}` was patched".format(name))
         return resp
@@ -247,7 +678,8 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_custom_object(self, name, group, version, plural, body):
-        resp = self.k8s_custom_object_api.create_namespaced_custom_object(
+        resp = self._call(
+            self.k8s_custom_object_api.create_namespaced_custom_object,
             group=group,
             version=version,
             plural=plural,
@@ -258,7 +690,8 @@ class K8SManager(object):
         return resp
 
     def update_custom_object(self, name, group, version, plural, body):
-        resp = self.k8s_custom_object_api.patch_namespaced_custom_object(
+        resp = self._call(
+            self.k8s_custom_object_api.patch_namespaced_custom_object,
             name=name,
             group=group,
             version=version,
@@ -299,15 +732,20 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_deployment(self, name, body):
-        resp = self.k8s_apps_api.create_namespaced_deployment(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_apps_api.create_namespaced_deployment,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Deployment `{}` was created".format(name))
         return resp
 
     def update_deployment(self, name, body):
-        resp = self.k8s_apps_api.patch_namespaced_deployment(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_apps_api.patch_namespaced_deployment,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Deployment `{}` was patched".format(name))
         return resp
@@ -325,12 +763,12 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_volume(self, name, body):
-        resp = self.k8s_api.create_persistent_volume(body=body)
+        resp = self._call(self.k8s_api.create_persistent_volume, body=body)
         logger.debug("Persistent volume `{}` was created".format(name))
         return resp
 
     def update_volume(self, name, body):
-        resp = self.k8s_api.patch_persistent_volume(name=name, body=body)
+        resp = self._call(self.k8s_api.patch_persistent_volume, name=name, body=body)
         logger.debug("Persistent volume `{}` was patched".format(name))
         return resp
 
@@ -347,15 +785,20 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_volume_claim(self, name, body):
-        resp = self.k8s_api.create_namespaced_persistent_volume_claim(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.create_namespaced_persistent_volume_claim,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Volume claim `{}` was created".format(name))
         return resp
 
     def update_volume_claim(self, name, body):
-        resp = self.k8s_api.patch_namespaced_persistent_volume_claim(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.k8s_api.patch_namespaced_persistent_volume_claim,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Volume claim `{}` was patched".format(name))
         return resp
@@ -373,15 +816,20 @@ class K8SManager(object):
                     logger.error("K8S error: {}".format(e))
 
     def create_ingress(self, name, body):
-        resp = self.networking_v1_beta1_api.create_namespaced_ingress(
-            namespace=self.namespace, body=body
+        resp = self._call(
+            self.networking_v1_beta1_api.create_namespaced_ingress,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("ingress `{}` was created".format(name))
         return resp
 
     def update_ingress(self, name, body):
-        resp = self.networking_v1_beta1_api.patch_namespaced_ingress(
-            name=name, namespace=self.namespace, body=body
+        resp = self._call(
+            self.networking_v1_beta1_api.patch_namespaced_ingress,
+            name=name,
+            namespace=self.namespace,
+            body=body,
         )
         logger.debug("Ingress `{}` was patched".format(name))
         return resp
@@ -398,57 +846,117 @@ class K8SManager(object):
                 else:
                     logger.error("K8S error: {}".format(e))
 
-    def get_config_map(self, name, reraise=False):
+    def create_lease(self, name, body, request_timeout=None):
+        resp = self._call(
+            self.k8s_coordination_api.create_namespaced_lease,
+            request_timeout=request_timeout,
+            namespace=self.namespace,
+            body=body,
+        )
+        logger.debug("Lease `{}` was created".format(name))
+        return resp
+
+    def update_lease(self, name, body, request_timeout=None):
+        resp = self._call(
+            self.k8s_coordination_api.patch_namespaced_lease,
+            request_timeout=request_timeout,
+            name=name,
+            namespace=self.namespace,
+            body=body,
+        )
+        logger.debug("Lease `{}` was patched".format(name))
+        return resp
+
+    def create_or_update_lease(self, name, body, reraise=False):
         try:
-            return self.k8s_api.read_namespaced_config_map(
-                name=name, namespace=self.namespace
+            return self.create_lease(name=name, body=body)
+        except ApiException:
+            try:
+                return self.update_lease(name=name, body=body)
+            except ApiException as e:
+                if reraise:
+                    raise PolyaxonK8SError(e)
+                else:
+                    logger.error("K8S error: {}".format(e))
+
+    def get_config_map(self, name, reraise=False, request_timeout=None):
+        try:
+            return self._call(
+                self.k8s_api.read_namespaced_config_map,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_secret(self, name, reraise=False):
+    def get_secret(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_api.read_namespaced_secret(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.k8s_api.read_namespaced_secret,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_service(self, name, reraise=False):
+    def get_service(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_api.read_namespaced_service(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.k8s_api.read_namespaced_service,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_pod(self, name, reraise=False):
+    def get_pod(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_api.read_namespaced_pod(name=name, namespace=self.namespace)
+            return self._call(
+                self.k8s_api.read_namespaced_pod,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
+            )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_job(self, name, reraise=False):
+    def get_job(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_batch_api.read_namespaced_job(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.k8s_batch_api.read_namespaced_job,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_custom_object(self, name, group, version, plural, reraise=False):
+    def get_custom_object(
+        self, name, group, version, plural, reraise=False, request_timeout=None
+    ):
         try:
-            return self.k8s_custom_object_api.get_namespaced_custom_object(
+            return self._call(
+                self.k8s_custom_object_api.get_namespaced_custom_object,
+                idempotent=True,
+                request_timeout=request_timeout,
                 name=name,
                 group=group,
                 version=version,
@@ -460,38 +968,69 @@ class K8SManager(object):
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_deployment(self, name, reraise=False):
+    def get_deployment(self, name, reraise=False, request_timeout=None):
+        try:
+            return self._call(
+                self.k8s_apps_api.read_namespaced_deployment,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
+            )
+        except ApiException as e:
+            if reraise:
+                raise PolyaxonK8SError(e)
+            return None
+
+    def get_volume(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_apps_api.read_namespaced_deployment(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.k8s_api.read_persistent_volume,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_volume(self, name, reraise=False):
+    def get_volume_claim(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_api.read_persistent_volume(name=name)
+            return self._call(
+                self.k8s_api.read_namespaced_persistent_volume_claim,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
+            )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_volume_claim(self, name, reraise=False):
+    def get_ingress(self, name, reraise=False, request_timeout=None):
         try:
-            return self.k8s_api.read_namespaced_persistent_volume_claim(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.networking_v1_beta1_api.read_namespaced_ingress,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
                 raise PolyaxonK8SError(e)
             return None
 
-    def get_ingress(self, name, reraise=False):
+    def get_lease(self, name, reraise=False, request_timeout=None):
         try:
-            return self.networking_v1_beta1_api.read_namespaced_ingress(
-                name=name, namespace=self.namespace
+            return self._call(
+                self.k8s_coordination_api.read_namespaced_lease,
+                idempotent=True,
+                request_timeout=request_timeout,
+                name=name,
+                namespace=self.namespace,
             )
         except ApiException as e:
             if reraise:
@@ -500,7 +1039,8 @@ class K8SManager(object):
 
     def delete_config_map(self, name, reraise=False):
         try:
-            self.k8s_api.delete_namespaced_config_map(
+            self._call(
+                self.k8s_api.delete_namespaced_config_map,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
@@ -514,7 +1054,8 @@ class K8SManager(object):
 
     def delete_secret(self, name, reraise=False):
         try:
-            self.k8s_api.delete_namespaced_secret(
+            self._call(
+                self.k8s_api.delete_namespaced_secret,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
@@ -528,7 +1069,8 @@ class K8SManager(object):
 
     def delete_service(self, name, reraise=False):
         try:
-            self.k8s_api.delete_namespaced_service(
+            self._call(
+                self.k8s_api.delete_namespaced_service,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
@@ -542,7 +1084,8 @@ class K8SManager(object):
 
     def delete_pod(self, name, reraise=False):
         try:
-            self.k8s_api.delete_namespaced_pod(
+            self._call(
+                self.k8s_api.delete_namespaced_pod,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
@@ -554,12 +1097,16 @@ class K8SManager(object):
             else:
                 logger.debug("Pod `{}` was not found".format(name))
 
-    def delete_job(self, name, reraise=False):
+    def delete_job(self, name, reraise=False, propagation_policy=None):
         try:
-            self.k8s_batch_api.delete_namespaced_job(
+            self._call(
+                self.k8s_batch_api.delete_namespaced_job,
                 name=name,
                 namespace=self.namespace,
-                body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
+                body=client.V1DeleteOptions(
+                    api_version=constants.K8S_API_VERSION_V1,
+                    propagation_policy=propagation_policy,
+                ),
             )
             logger.debug("Pod `{}` deleted".format(name))
         except ApiException as e:
@@ -570,7 +1117,8 @@ class K8SManager(object):
 
     def delete_custom_object(self, name, group, version, plural, reraise=False):
         try:
-            self.k8s_custom_object_api.delete_namespaced_custom_object(
+            self._call(
+                self.k8s_custom_object_api.delete_namespaced_custom_object,
                 name=name,
                 group=group,
                 version=version,
@@ -587,7 +1135,8 @@ class K8SManager(object):
 
     def delete_deployment(self, name, reraise=False):
         try:
-            self.k8s_apps_api.delete_namespaced_deployment(
+            self._call(
+                self.k8s_apps_api.delete_namespaced_deployment,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(
@@ -604,7 +1153,8 @@ class K8SManager(object):
 
     def delete_volume(self, name, reraise=False):
         try:
-            self.k8s_api.delete_persistent_volume(
+            self._call(
+                self.k8s_api.delete_persistent_volume,
                 name=name,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
             )
@@ -617,7 +1167,8 @@ class K8SManager(object):
 
     def delete_volume_claim(self, name, reraise=False):
         try:
-            self.k8s_api.delete_namespaced_persistent_volume_claim(
+            self._call(
+                self.k8s_api.delete_namespaced_persistent_volume_claim,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(api_version=constants.K8S_API_VERSION_V1),
@@ -631,7 +1182,8 @@ class K8SManager(object):
 
     def delete_ingress(self, name, reraise=False):
         try:
-            self.networking_v1_beta1_api.delete_namespaced_ingress(
+            self._call(
+                self.networking_v1_beta1_api.delete_namespaced_ingress,
                 name=name,
                 namespace=self.namespace,
                 body=client.V1DeleteOptions(
@@ -646,6 +1198,145 @@ class K8SManager(object):
             else:
                 logger.debug("Ingress `{}` was not found".format(name))
 
+    def delete_lease(self, name, reraise=False):
+        try:
+            self._call(
+                self.k8s_coordination_api.delete_namespaced_lease,
+                name=name,
+                namespace=self.namespace,
+                body=client.V1DeleteOptions(
+                    api_version=constants.K8S_API_VERSION_COORDINATION_V1
+                ),
+            )
+            logger.debug("Lease `{}` deleted".format(name))
+        except ApiException as e:
+            if reraise:
+                raise PolyaxonK8SError(e)
+            else:
+                logger.debug("Lease `{}` was not found".format(name))
+
+    def delete_pod_collection(self, labels, field_selector=None, reraise=False):
+        kwargs = {"field_selector": field_selector} if field_selector else {}
+        try:
+            self._call(
+                self.k8s_api.delete_collection_namespaced_pod,
+                namespace=self.namespace,
+                label_selector=labels,
+                **kwargs
+            )
+            logger.debug("Pods `{}` deleted".format(labels))
+        except ApiException as e:
+            if reraise:
+                raise PolyaxonK8SError(e)
+            else:
+                logger.debug("Pods `{}` were not deleted".format(labels))
+
+    def delete_ingress_collection(self, labels, reraise=False):
+        try:
+            self._call(
+                self.networking_v1_beta1_api.delete_collection_namespaced_ingress,
+                namespace=self.namespace,
+                label_selector=labels,
+            )
+            logger.debug("Ingresses `{}` deleted".format(labels))
+        except ApiException as e:
+            if reraise:
+                raise PolyaxonK8SError(e)
+            else:
+                logger.debug("Ingresses `{}` were not deleted".format(labels))
+
+    def copy_to_pod(
+        self,
+        name,
+        local_path,
+        remote_path,
+        container=None,
+        progress=None,
+        manifest=None,
+        chunk_size=constants.TRANSFER_CHUNK_SIZE,
+    ):
+        """Streams a local file or directory as a tar archive over exec.
+
+        `progress(path, transferred, size)` is called as files are sent,
+        returns a `TransferManifest` that can be passed to resume a failed transfer.
+        """
+        return copy_to_pod(
+            manager=self,
+            pod_name=name,
+            local_path=local_path,
+            remote_path=remote_path,
+            container=container,
+            progress=progress,
+            manifest=manifest,
+            chunk_size=chunk_size,
+        )
+
+    def copy_from_pod(
+        self,
+        name,
+        remote_path,
+        local_path,
+        container=None,
+        progress=None,
+        manifest=None,
+        chunk_size=constants.TRANSFER_CHUNK_SIZE,
+    ):
+        """Streams a file or directory of a pod as a tar archive over exec."""
+        return copy_from_pod(
+            manager=self,
+            pod_name=name,
+            remote_path=remote_path,
+            local_path=local_path,
+            container=container,
+            progress=progress,
+            manifest=manifest,
+            chunk_size=chunk_size,
+        )
+
+    def copy_to_pods(
+        self,
+        names,
+        local_path,
+        remote_path,
+        container=None,
+        progress=None,
+        max_workers=constants.TRANSFER_MAX_WORKERS,
+    ):
+        """Copies to many pods concurrently, returns their manifests or errors."""
+
+        def transfer(name):
+            return self.copy_to_pod(
+                name=name,
+                local_path=local_path,
+                remote_path=remote_path,
+                container=container,
+                progress=progress,
+            )
+
+        return run_transfers(transfer, pod_names=names, max_workers=max_workers)
+
+    def copy_from_pods(
+        self,
+        names,
+        remote_path,
+        local_path,
+        container=None,
+        progress=None,
+        max_workers=constants.TRANSFER_MAX_WORKERS,
+    ):
+        """Copies from many pods concurrently, into a `local_path` directory per pod."""
+
+        def transfer(name):
+            return self.copy_from_pod(
+                name=name,
+                remote_path=remote_path,
+                local_path=os.path.join(local_path, name),
+                container=container,
+                progress=progress,
+            )
+
+        return run_transfers(transfer, pod_names=names, max_workers=max_workers)
+
     def delete_pods(self, labels, include_uninitialized=True, reraise=False):
         objs = self.list_pods(
             labels=labels, include_uninitialized=include_uninitialized, reraise=reraise
@@ -671,6 +1362,6 @@ class K8SManager(object):
             self.delete_deployment(name=obj.metadata.name, reraise=reraise)
 
     def delete_ingresses(self, labels, reraise=False):
-        objs = self.list_services(labels=labels, reraise=reraise)
+        objs = self.list_ingresses(labels=labels, reraise=reraise)
         for obj in objs:
             self.delete_ingress(name=obj.metadata.name, reraise=reraise)
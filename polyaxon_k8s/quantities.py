@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+
+BINARY_SUFFIXES = {
+    "Ki": 2 ** 10,
+    "Mi": 2 ** 20,
+    "Gi": 2 ** 30,
+    "Ti": 2 ** 40,
+    "Pi": 2 ** 50,
+    "Ei": 2 ** 60,
+}
+DECIMAL_SUFFIXES = {
+    "n": 1e-9,
+    "u": 1e-6,
+    "m": 1e-3,
+    "": 1,
+    "k": 1e3,
+    "K": 1e3,
+    "M": 1e6,
+    "G": 1e9,
+    "T": 1e12,
+    "P": 1e15,
+    "E": 1e18,
+}
+
+
+def parse_quantity(quantity):
+    """Parses a Kubernetes quantity, e.g. `250m` cpu or `1Gi` memory, to a float."""
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    quantity = str(quantity).strip()
+    try:
+        if quantity[-2:] in BINARY_SUFFIXES:
+            return float(quantity[:-2]) * BINARY_SUFFIXES[quantity[-2:]]
+        if quantity[-1:] in DECIMAL_SUFFIXES:
+            return float(quantity[:-1]) * DECIMAL_SUFFIXES[quantity[-1:]]
+        return float(quantity)
+    except ValueError:
+        raise PolyaxonK8SError("Quantity `{}` is not valid".format(quantity))
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import threading
+import time
+
+from collections import defaultdict
+
+from dateutil import parser as dt_parser
+from dateutil.tz import tzutc
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.coordination import get_metadata_value
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+from polyaxon_k8s.logger import logger
+from polyaxon_k8s.runner import PeriodicRunner
+
+
+class RateLimiter(object):
+    """Token bucket allowing `rate` calls per second, in bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = self.burst
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.time()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0
+            self._tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ReaperStats(object):
+    def __init__(self):
+        self.runs = 0
+        self.reaped = 0
+        self.errors = 0
+        self.backlog = 0
+        self.last_run_duration = 0
+        self.throughput = 0
+
+    def to_dict(self):
+        return {
+            "runs": self.runs,
+            "reaped": self.reaped,
+            "errors": self.errors,
+            "backlog": self.backlog,
+            "last_run_duration": self.last_run_duration,
+            "throughput": self.throughput,
+        }
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    return dt_parser.parse(value)
+
+
+def get_pod_finished_at(pod):
+    finished_at = [
+        s.state.terminated.finished_at
+        for s in pod.status.container_statuses or []
+        if s.state and s.state.terminated and s.state.terminated.finished_at
+    ]
+    if finished_at:
+        return max(finished_at)
+    return pod.status.start_time or pod.metadata.creation_timestamp
+
+
+def get_job_finished_at(job):
+    """Returns the time a job completed or failed, None if it is still active."""
+    if job.status.completion_time:
+        return job.status.completion_time
+    for condition in job.status.conditions or []:
+        if condition.type in ("Complete", "Failed") and condition.status == "True":
+            return condition.last_transition_time or job.metadata.creation_timestamp
+    return None
+
+
+class Reaper(PeriodicRunner):
+    """Deletes the workloads of finished experiments once they are older than `ttl`.
+
+    Objects are grouped by the value of `experiment_label`: an experiment is
+    reaped when none of its pods or jobs is active anymore.
+    Pods are found with field selectors, services and ingresses with metadata
+    only lists, and deletions are throttled to `rate` calls per second,
+    in batches of `batch_size` experiments.
+
+    In sharded mode, experiments are judged on the objects of all the shards,
+    but only the objects of this replica's shard are deleted, by collection
+    if the shards are keyed by `experiment_label`, otherwise by name.
+    """
+
+    def __init__(
+        self,
+        manager,
+        experiment_label,
+        labels=None,
+        ttl=constants.REAPER_TTL,
+        interval=constants.REAPER_INTERVAL,
+        batch_size=constants.REAPER_BATCH_SIZE,
+        rate=constants.REAPER_RATE,
+    ):
+        super(Reaper, self).__init__(interval=interval)
+        self.manager = manager
+        self.experiment_label = experiment_label
+        self.labels = labels
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(rate=rate)
+        self.stats = ReaperStats()
+
+    @property
+    def selector(self):
+        if self.labels:
+            return "{},{}".format(self.labels, self.experiment_label)
+        return self.experiment_label
+
+    def get_experiment_selector(self, experiment):
+        selector = "{}={}".format(self.experiment_label, experiment)
+        if self.labels:
+            return "{},{}".format(self.labels, selector)
+        return selector
+
+    @property
+    def owns_experiments(self):
+        """True if all the objects of an experiment are in this replica's shard."""
+        shard = self.manager.shard
+        return shard is None or shard.shard_label == self.experiment_label
+
+    def _get_experiment(self, obj):
+        return (get_metadata_value(obj, "labels") or {}).get(self.experiment_label)
+
+    def find_finished_experiments(self):
+        """Returns the experiments to reap, oldest first, with their objects."""
+        deadline = datetime.datetime.now(tzutc()) - datetime.timedelta(seconds=self.ttl)
+        active = set()
+        finished_at = {}
+        objects = defaultdict(lambda: defaultdict(list))
+
+        def set_finished(experiment, value):
+            if value and (
+                experiment not in finished_at or finished_at[experiment] < value
+            ):
+                finished_at[experiment] = value
+
+        for pod in self.manager.list_pods_metadata(
+            labels=self.selector,
+            field_selector=constants.K8S_ACTIVE_POD_FIELD_SELECTOR,
+            reraise=True,
+        ):
+            active.add(self._get_experiment(pod))
+        for pod in self.manager.list_pods(
+            labels=self.selector,
+            field_selector=constants.K8S_FINISHED_POD_FIELD_SELECTOR,
+            reraise=True,
+            sharded=False,
+        ):
+            experiment = self._get_experiment(pod)
+            set_finished(experiment, get_pod_finished_at(pod))
+            if self.manager.in_shard(pod):
+                objects[experiment]["pods"].append(pod.metadata.name)
+        for job in self.manager.list_jobs(
+            labels=self.selector, reraise=True, sharded=False
+        ):
+            experiment = self._get_experiment(job)
+            job_finished_at = get_job_finished_at(job)
+            if job_finished_at is None:
+                active.add(experiment)
+            set_finished(experiment, job_finished_at)
+            if self.manager.in_shard(job):
+                objects[experiment]["jobs"].append(job.metadata.name)
+        services = self.manager.list_services_metadata(
+            labels=self.selector, reraise=True
+        )
+        ingresses = self.manager.list_ingresses_metadata(
+            labels=self.selector, reraise=True
+        )
+        for kind, objs in (("services", services), ("ingresses", ingresses)):
+            for obj in objs:
+                if not self.manager.in_shard(obj):
+                    continue
+                experiment = self._get_experiment(obj)
+                # Left over from an experiment whose pods and jobs were already reaped
+                if experiment not in finished_at and experiment not in objects:
+                    set_finished(
+                        experiment,
+                        _to_datetime(get_metadata_value(obj, "creationTimestamp")),
+                    )
+                objects[experiment][kind].append(get_metadata_value(obj, "name"))
+
+        experiments = sorted(
+            (_to_datetime(value), experiment)
+            for experiment, value in finished_at.items()
+            if experiment not in active
+        )
+        # Experiments without objects in this replica's shard are left to others
+        return [
+            (experiment, objects[experiment])
+            for value, experiment in experiments
+            if value < deadline and experiment in objects
+        ]
+
+    def reap_experiment(self, experiment, objects):
+        """Deletes the objects of an experiment, returns the number of reaped objects."""
+        selector = self.get_experiment_selector(experiment)
+        for name in objects.get("jobs", []):
+            self.rate_limiter.acquire()
+            self.manager.delete_job(
+                name=name, reraise=True, propagation_policy="Background"
+            )
+        if self.owns_experiments and objects.get("pods"):
+            self.rate_limiter.acquire()
+            self.manager.delete_pod_collection(
+                labels=selector,
+                field_selector=constants.K8S_FINISHED_POD_FIELD_SELECTOR,
+                reraise=True,
+            )
+        elif objects.get("pods"):
+            # Collections would delete the pods of other shards
+            for name in objects["pods"]:
+                self.rate_limiter.acquire()
+                self.manager.delete_pod(name=name, reraise=True)
+        for name in objects.get("services", []):
+            self.rate_limiter.acquire()
+            self.manager.delete_service(name=name, reraise=True)
+        if self.owns_experiments and objects.get("ingresses"):
+            self.rate_limiter.acquire()
+            self.manager.delete_ingress_collection(labels=selector, reraise=True)
+        elif objects.get("ingresses"):
+            for name in objects["ingresses"]:
+                self.rate_limiter.acquire()
+                self.manager.delete_ingress(name=name, reraise=True)
+        return sum(len(names) for names in objects.values())
+
+    def tick(self):
+        start = time.time()
+        experiments = self.find_finished_experiments()
+        self.stats.backlog = len(experiments)
+        reaped = 0
+        for i in range(0, len(experiments), self.batch_size):
+            if self.is_stopped:
+                break
+            for experiment, objects in experiments[i : i + self.batch_size]:
+                try:
+                    reaped += self.reap_experiment(experiment, objects)
+                except PolyaxonK8SError as e:
+                    self.stats.errors += 1
+                    logger.error("K8S error: {}".format(e))
+                self.stats.backlog -= 1
+        duration = time.time() - start
+        self.stats.runs += 1
+        self.stats.reaped += reaped
+        self.stats.last_run_duration = duration
+        self.stats.throughput = reaped / duration if duration else 0
+        logger.debug("Reaper stats: {}".format(self.stats.to_dict()))
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import json
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from six.moves import queue
+
+from polyaxon_k8s import constants
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def to_request_timeout(timeout):
+    """Converts a timeout in seconds to a value accepted by `_request_timeout`.
+
+    The rest client silently ignores float totals, so non integer values
+    are split into a (connect, read) pair that sums to the timeout.
+    """
+    if timeout is None or isinstance(timeout, tuple):
+        return timeout
+    if isinstance(timeout, int):
+        return timeout
+    connect_timeout = timeout * constants.REQUEST_CONNECT_TIMEOUT_SHARE
+    return connect_timeout, timeout - connect_timeout
+
+
+def is_server_failure(exception):
+    """Returns True if the exception means the apiserver is unhealthy.
+
+    Client errors (404, 409, 422, ...) are answered by a healthy apiserver
+    and must not trip the breaker.
+    """
+    if not isinstance(exception, ApiException):
+        return True
+    return exception.status in (0, 429) or (exception.status or 0) >= 500
+
+
+def to_api_exception(exception):
+    """Wraps transport errors, e.g. timeouts, the way the rest client does."""
+    if isinstance(exception, ApiException):
+        return exception
+    return ApiException(
+        status=0, reason="{}\n{}".format(type(exception).__name__, exception)
+    )
+
+
+class LatencyTracker(object):
+    """Keeps a bounded window of call latencies to derive percentiles."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+
+class CircuitBreaker(object):
+    """Fails fast after consecutive server failures.
+
+    The circuit opens after `failure_threshold` consecutive failures, and lets
+    a single probe call through once `recovery_timeout` seconds have elapsed;
+    the probe's outcome either closes the circuit or opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_OPEN:
+                if time.time() - self._opened_at >= self.recovery_timeout:
+                    self._state = CIRCUIT_HALF_OPEN
+                    return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.time()
+
+
+class LRUCache(object):
+    """A small thread safe LRU cache, e.g. of the last successful reads."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value = self._data.pop(key)
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def hedged_call(fn, delay, observe=None, **kwargs):
+    """Calls `fn`, and fires a duplicate call if no answer came after `delay`.
+
+    Returns the first successful answer; raises the last error if both fail.
+    The slower call is left to finish in the background and its result is dropped.
+    `observe` is called with the latency of the first call once it completes,
+    even when the duplicate answered first.
+    """
+    results = queue.Queue()
+
+    def run(primary):
+        start = time.time()
+        try:
+            result = (True, fn(**kwargs))
+        except Exception as e:
+            result = (False, e)
+        if primary and observe:
+            observe(time.time() - start)
+        results.put(result)
+
+    def start(primary=False):
+        thread = threading.Thread(target=run, args=(primary,))
+        thread.daemon = True
+        thread.start()
+
+    start(primary=True)
+    try:
+        ok, value = results.get(timeout=delay)
+        pending = 0
+    except queue.Empty:
+        start()
+        ok, value = results.get()
+        pending = 1
+    if not ok and pending:
+        ok, value = results.get()
+    if ok:
+        return value
+    raise value
+
+
+class Watch(watch.Watch):
+    """Watch that yields ERROR events with their Status as a raw dict.
+
+    The client deserializes ERROR Statuses, e.g. a 410 expired resource version,
+    into the watched model, which raises for models with required fields
+    and hides the error from the caller.
+    """
+
+    def unmarshal_event(self, data, return_type):
+        try:
+            js = json.loads(data)
+        except ValueError:
+            return data
+        js["raw_object"] = js["object"]
+        if js.get("type") == "ERROR" or not return_type:
+            return js
+        obj = watch.watch.SimpleNamespace(data=json.dumps(js["raw_object"]))
+        js["object"] = self._api_client.deserialize(obj, return_type)
+        metadata = getattr(js["object"], "metadata", None)
+        if metadata is not None:
+            self.resource_version = metadata.resource_version
+        elif isinstance(js["object"], dict):
+            # Custom objects without a model are deserialized as dicts
+            resource_version = (js["object"].get("metadata") or {}).get(
+                "resourceVersion"
+            )
+            if resource_version:
+                self.resource_version = resource_version
+        return js
+
+
+def get_watch_error_code(event):
+    """Returns the Status code of an ERROR watch event, e.g. 410 if expired."""
+    return (event.get("raw_object") or {}).get("code")
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+from kubernetes.client.rest import ApiException
+
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+from polyaxon_k8s.logger import logger
+
+
+class PeriodicRunner(object):
+    """Runs `tick` every `interval` seconds in a daemon thread.
+
+    Abstract, subclasses implement `tick`, and optionally `on_stop`.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None
+
+    @property
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def on_stop(self):
+        pass
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.tick()
+                except (ApiException, PolyaxonK8SError) as e:
+                    logger.error("K8S error: {}".format(e))
+                except Exception:
+                    # E.g. a failing callback, the runner keeps going
+                    logger.exception("`{}` tick failed".format(type(self).__name__))
+                self._stop_event.wait(self.interval)
+        finally:
+            self.on_stop()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import base64
+import json
+import os
+import tarfile
+import time
+import uuid
+
+from multiprocessing.pool import ThreadPool
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from kubernetes.stream import stream
+from kubernetes.stream.ws_client import ERROR_CHANNEL
+from six.moves import shlex_quote
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+from polyaxon_k8s.logger import logger
+
+# The exec websocket has no way to close stdin, the end of the input is marked
+# with a sentinel line, and the channels only carry text, so data is base64 encoded.
+EOF_SENTINEL = "__POLYAXON_EOF__"
+READ_STDIN = "awk '$0 == \"{}\" {{exit}} {{print}}'".format(EOF_SENTINEL)
+# Reads `size mtime path` lines and prints the paths of the files that did not
+# change, escaped for `tar -X` which matches the names as glob patterns.
+FILTER_UNCHANGED = (
+    "while IFS= read -r line; do "
+    "size=${{line%% *}}; line=${{line#* }}; mtime=${{line%% *}}; path=${{line#* }}; "
+    'if [ "$(stat -c \'%s %Y\' {parent}/"$path" 2>/dev/null)" = "$size $mtime" ]; '
+    "then printf '%s\\n' \"$path\"; fi; "
+    "done | sed 's/[][*?\\\\]/\\\\&/g'"
+)
+
+
+def write_eof(exec_stream, line_length=0):
+    # Some awks (mawk) only process their input once their buffer is full,
+    # which never happens while stdin is open, so the sentinel is padded.
+    exec_stream.write(EOF_SENTINEL + "\n" * max(4096, 2 * line_length))
+
+
+class TransferManifest(object):
+    """Files of a transfer with their size and mtime.
+
+    Passing the manifest of an interrupted transfer to a new one skips
+    the files that were already transferred and did not change since.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, path, size, mtime):
+        self.entries[path] = (size, int(mtime))
+
+    def has(self, path, size, mtime):
+        return self.entries.get(path) == (size, int(mtime))
+
+    def to_dict(self):
+        return {path: list(entry) for path, entry in self.entries.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({path: tuple(entry) for path, entry in data.items()})
+
+
+class ExecStream(object):
+    """Text stream over a pod exec websocket."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.stderr = ""
+        self.status = None
+
+    def write(self, data):
+        self.ws.write_stdin(data)
+
+    def read(self, timeout=constants.TRANSFER_READ_TIMEOUT):
+        """Reads the stdout received in at most `timeout` seconds."""
+        self.ws.update(timeout=timeout)
+        stdout = self.ws.read_stdout(timeout=0)
+        stderr = self.ws.read_stderr(timeout=0)
+        status = self.ws.read_channel(ERROR_CHANNEL, timeout=0)
+        # WSClient keeps a copy of all the output for `read_all`,
+        # drop it to not buffer the whole transfer in memory.
+        self.ws._all = ""
+        if stderr:
+            self.stderr = (self.stderr + stderr)[-constants.TRANSFER_STDERR_SIZE :]
+        if status:
+            self.status = json.loads(status)
+        return stdout
+
+    @property
+    def is_open(self):
+        return self.ws.is_open()
+
+    def wait(self, timeout=None, on_stdout=None):
+        start = time.time()
+        while self.is_open and self.status is None:
+            if timeout and time.time() - start > timeout:
+                raise PolyaxonK8SError("Exec timed out after {}s".format(timeout))
+            stdout = self.read()
+            if stdout and on_stdout:
+                on_stdout(stdout)
+
+    def close(self):
+        self.ws.close()
+
+    def check(self):
+        if self.status and self.status.get("status") != "Success":
+            raise PolyaxonK8SError(
+                "Exec failed: {} {}".format(self.status.get("message"), self.stderr)
+            )
+
+
+class Base64Writer(object):
+    """Sends the written bytes base64 encoded, in lines of `chunk_size` bytes."""
+
+    def __init__(self, exec_stream, chunk_size=constants.TRANSFER_CHUNK_SIZE):
+        self.exec_stream = exec_stream
+        # Base64 encodes groups of 3 bytes, so chunks can be decoded independently
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        self._buffer = b""
+
+    def _send(self, data):
+        self.exec_stream.write(base64.b64encode(data).decode("ascii") + "\n")
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._send(self._buffer[: self.chunk_size])
+            self._buffer = self._buffer[self.chunk_size :]
+
+    def close(self):
+        if self._buffer:
+            self._send(self._buffer)
+            self._buffer = b""
+        write_eof(self.exec_stream, line_length=4 * self.chunk_size // 3)
+
+
+class Base64Reader(object):
+    """Reads and decodes base64 encoded stdout, as a file object for `tarfile`."""
+
+    def __init__(self, exec_stream):
+        self.exec_stream = exec_stream
+        self._encoded = ""
+        self._buffer = b""
+
+    def _fill(self, size):
+        while len(self._buffer) < size and self.exec_stream.is_open:
+            self._encoded += "".join(self.exec_stream.read().split())
+            usable = len(self._encoded) - len(self._encoded) % 4
+            if usable:
+                self._buffer += base64.b64decode(self._encoded[:usable])
+                self._encoded = self._encoded[usable:]
+
+    def read(self, size):
+        self._fill(size)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class LineCollector(object):
+    """Collects the lines of a text stream received in arbitrary chunks."""
+
+    def __init__(self):
+        self.lines = []
+        self._partial = ""
+
+    def __call__(self, data):
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        self.lines.extend(lines)
+
+
+class ProgressFile(object):
+    """Wraps a file object to report the bytes read or written."""
+
+    def __init__(self, fileobj, path, size, progress):
+        self.fileobj = fileobj
+        self.path = path
+        self.size = size
+        self.progress = progress
+        self.transferred = 0
+
+    def _report(self, length):
+        self.transferred += length
+        if self.progress:
+            self.progress(self.path, self.transferred, self.size)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self._report(len(data))
+        return data
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self._report(len(data))
+
+
+def _exec(manager, pod_name, command, container=None):
+    # `stream` swaps the api client's request method while connecting,
+    # a dedicated client keeps concurrent calls on the manager's client safe.
+    api = client.CoreV1Api(
+        client.ApiClient(configuration=manager.k8s_api.api_client.configuration)
+    )
+    kwargs = {"container": container} if container else {}
+    try:
+        ws = stream(
+            api.connect_get_namespaced_pod_exec,
+            pod_name,
+            manager.namespace,
+            command=["sh", "-c", command],
+            stdin=True,
+            stdout=True,
+            stderr=True,
+            tty=False,
+            _preload_content=False,
+            **kwargs
+        )
+    except ApiException as e:
+        raise PolyaxonK8SError(e)
+    return ExecStream(ws)
+
+
+def _walk(local_path):
+    """Yields the paths to archive, and their names in the archive."""
+    local_path = os.path.abspath(local_path)
+    parent = os.path.dirname(local_path)
+    yield local_path, os.path.relpath(local_path, parent)
+    if os.path.isdir(local_path):
+        for root, dirs, files in os.walk(local_path):
+            dirs.sort()
+            for name in sorted(dirs) + sorted(files):
+                path = os.path.join(root, name)
+                yield path, os.path.relpath(path, parent)
+
+
+def copy_to_pod(
+    manager,
+    pod_name,
+    local_path,
+    remote_path,
+    container=None,
+    progress=None,
+    manifest=None,
+    chunk_size=constants.TRANSFER_CHUNK_SIZE,
+):
+    """Streams a local file or directory into the `remote_path` directory of a pod.
+
+    Returns the manifest of the transferred files, if the transfer fails the
+    manifest is attached to the error as `manifest` to resume from it.
+    """
+    manifest = TransferManifest(manifest.entries if manifest else None)
+    exec_stream = _exec(
+        manager,
+        pod_name,
+        "mkdir -p {path} && {read} | base64 -d | tar xvf - -C {path}".format(
+            path=shlex_quote(remote_path), read=READ_STDIN
+        ),
+        container=container,
+    )
+    writer = Base64Writer(exec_stream, chunk_size=chunk_size)
+    # The pod's tar lists the members it extracts
+    extracted = LineCollector()
+    sent = []
+
+    try:
+        tar = tarfile.open(fileobj=writer, mode="w|")
+        for path, arcname in _walk(local_path):
+            tarinfo = tar.gettarinfo(path, arcname=arcname)
+            if tarinfo.isfile():
+                if manifest.has(arcname, tarinfo.size, tarinfo.mtime):
+                    continue
+                with open(path, "rb") as f:
+                    tar.addfile(
+                        tarinfo, ProgressFile(f, arcname, tarinfo.size, progress)
+                    )
+                sent.append((arcname, tarinfo.size, tarinfo.mtime))
+            else:
+                tar.addfile(tarinfo)
+            # Drain the listing, the pod's tar blocks if nobody reads it
+            extracted(exec_stream.read(timeout=0))
+        tar.close()
+        writer.close()
+        exec_stream.wait(on_stdout=extracted)
+        exec_stream.check()
+    except (IOError, OSError, tarfile.TarError, PolyaxonK8SError) as e:
+        # Members are listed before they are extracted, so only the ones
+        # followed by another member are known to be complete in the pod.
+        complete = set(name.rstrip("/") for name in extracted.lines[:-1])
+        for entry in sent:
+            if entry[0] in complete:
+                manifest.add(*entry)
+        error = PolyaxonK8SError("Copy to pod `{}` failed: {}".format(pod_name, e))
+        error.manifest = manifest
+        raise error
+    finally:
+        exec_stream.close()
+    for entry in sent:
+        manifest.add(*entry)
+    logger.debug("Copied `{}` to pod `{}`".format(local_path, pod_name))
+    return manifest
+
+
+def _is_within(path, directory):
+    directory = os.path.abspath(directory)
+    return os.path.abspath(path).startswith(directory + os.sep)
+
+
+def copy_from_pod(
+    manager,
+    pod_name,
+    remote_path,
+    local_path,
+    container=None,
+    progress=None,
+    manifest=None,
+    chunk_size=constants.TRANSFER_CHUNK_SIZE,
+):
+    """Streams a file or directory of a pod into the `local_path` directory.
+
+    Files in `manifest` that did not change in the pod are excluded by its tar,
+    so they are not sent again.
+    Returns the manifest of the transferred files, if the transfer fails the
+    manifest is attached to the error as `manifest` to resume from it.
+    """
+    manifest = TransferManifest(manifest.entries if manifest else None)
+    remote_path = remote_path.rstrip("/")
+    tmp_path = "/tmp/.polyaxon-transfer-{}".format(uuid.uuid4().hex)
+    parent = shlex_quote(os.path.dirname(remote_path) or "/")
+    # `sh` may not support pipefail, tar's status is kept in a file
+    # and the temporary files are removed on exit.
+    exec_stream = _exec(
+        manager,
+        pod_name,
+        "trap 'rm -f {exclude} {status}' EXIT; {read} | {filter} > {exclude} && "
+        "{{ tar cf - -C {parent} -X {exclude} {name}; echo $? > {status}; }} | base64 "
+        '&& exit "$(cat {status})"'.format(
+            read=READ_STDIN,
+            filter=FILTER_UNCHANGED.format(parent=parent),
+            exclude=tmp_path + ".exclude",
+            status=tmp_path + ".status",
+            parent=parent,
+            name=shlex_quote(os.path.basename(remote_path)),
+        ),
+        container=container,
+    )
+    try:
+        for path, (size, mtime) in manifest.entries.items():
+            exec_stream.write("{} {} {}\n".format(size, mtime, path))
+        write_eof(exec_stream)
+
+        tar = tarfile.open(fileobj=Base64Reader(exec_stream), mode="r|")
+        for member in tar:
+            path = os.path.join(local_path, member.name)
+            if not _is_within(path, local_path):
+                logger.warning("Skipping `{}`, outside of the target".format(path))
+                continue
+            if member.isdir():
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+            elif member.isfile():
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                src = tar.extractfile(member)
+                with open(path, "wb") as f:
+                    dst = ProgressFile(f, member.name, member.size, progress)
+                    data = src.read(chunk_size)
+                    while data:
+                        dst.write(data)
+                        data = src.read(chunk_size)
+                os.utime(path, (member.mtime, member.mtime))
+                manifest.add(member.name, member.size, member.mtime)
+            else:
+                logger.debug("Skipping `{}`, not a file".format(member.name))
+        exec_stream.wait()
+        exec_stream.check()
+        if exec_stream.stderr:
+            # E.g. a file that changed or could not be read, the copy is incomplete
+            raise PolyaxonK8SError(exec_stream.stderr)
+    except (IOError, OSError, tarfile.TarError, PolyaxonK8SError) as e:
+        error = PolyaxonK8SError("Copy from pod `{}` failed: {}".format(pod_name, e))
+        error.manifest = manifest
+        raise error
+    finally:
+        exec_stream.close()
+    logger.debug("Copied `{}` from pod `{}`".format(remote_path, pod_name))
+    return manifest
+
+
+def run_transfers(transfer, pod_names, max_workers=constants.TRANSFER_MAX_WORKERS):
+    """Runs `transfer(pod_name)` concurrently on many pods.
+
+    Returns a dict of the pods' manifests or errors.
+    """
+
+    def run(pod_name):
+        try:
+            return pod_name, transfer(pod_name)
+        except PolyaxonK8SError as e:
+            logger.error("K8S error: {}".format(e))
+            return pod_name, e
+
+    pool = ThreadPool(processes=max(1, min(max_workers, len(pod_names))))
+    try:
+        return dict(pool.map(run, pod_names))
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+from array import array
+
+from polyaxon_k8s import constants
+from polyaxon_k8s.coordination import get_metadata_value
+from polyaxon_k8s.quantities import parse_quantity
+from polyaxon_k8s.runner import PeriodicRunner
+
+
+class RollingWindow(object):
+    """The last `size` samples of a value in a fixed size array of doubles."""
+
+    __slots__ = ("_values", "_index", "_count")
+
+    def __init__(self, size):
+        self._values = array("d", [0.0]) * size
+        self._index = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, value):
+        self._values[self._index] = value
+        self._index = (self._index + 1) % len(self._values)
+        self._count = min(self._count + 1, len(self._values))
+
+    def get_stats(self):
+        if not self._count:
+            return None
+        values = sorted(self._values[: self._count])
+        p95_index = min(self._count - 1, int(round(0.95 * (self._count - 1))))
+        return {
+            "min": values[0],
+            "max": values[-1],
+            "avg": sum(values) / self._count,
+            "p95": values[p95_index],
+            "last": self._values[self._index - 1],
+        }
+
+
+class ExperimentUsage(object):
+    """Rolling cpu (cores) and memory (bytes) usage of an experiment's pods."""
+
+    __slots__ = ("cpu", "memory", "pods", "last_seen")
+
+    def __init__(self, size):
+        self.cpu = RollingWindow(size)
+        self.memory = RollingWindow(size)
+        self.pods = 0
+        self.last_seen = 0
+
+    def to_dict(self):
+        return {
+            "cpu": self.cpu.get_stats(),
+            "memory": self.memory.get_stats(),
+            "pods": self.pods,
+            "samples": len(self.cpu),
+        }
+
+
+def get_containers_usage(pod_metrics):
+    cpu = 0.0
+    memory = 0.0
+    for container in pod_metrics.get("containers") or []:
+        usage = container.get("usage") or {}
+        cpu += parse_quantity(usage.get("cpu", 0))
+        memory += parse_quantity(usage.get("memory", 0))
+    return cpu, memory
+
+
+class UsageSampler(PeriodicRunner):
+    """Samples pod and node usage from `metrics.k8s.io` every `interval` seconds.
+
+    Pod metrics are joined to experiments by the value of `experiment_label`,
+    and every experiment keeps `window` samples of its summed cpu and memory.
+    Experiments without running pods for `max_idle` samples are dropped,
+    so memory does not grow with the number or the duration of experiments.
+    """
+
+    def __init__(
+        self,
+        manager,
+        experiment_label,
+        labels=None,
+        interval=constants.USAGE_INTERVAL,
+        window=constants.USAGE_WINDOW,
+        max_idle=constants.USAGE_MAX_IDLE,
+        sample_nodes=True,
+    ):
+        super(UsageSampler, self).__init__(interval=interval)
+        self.manager = manager
+        self.experiment_label = experiment_label
+        self.labels = labels
+        self.window = window
+        self.max_idle = max_idle
+        self.sample_nodes = sample_nodes
+        self.samples = 0
+        self.nodes = {}
+        self._experiments = {}
+        self._lock = threading.Lock()
+
+    @property
+    def selector(self):
+        if self.labels:
+            return "{},{}".format(self.labels, self.experiment_label)
+        return self.experiment_label
+
+    def _get_pods_experiments(self):
+        return {
+            get_metadata_value(pod, "name"): (
+                get_metadata_value(pod, "labels") or {}
+            ).get(self.experiment_label)
+            for pod in self.manager.list_pods_metadata(
+                labels=self.selector, reraise=True
+            )
+        }
+
+    def sample_pods(self):
+        """Returns the summed cpu, memory and number of pods per experiment."""
+        pods_metrics = self.manager.list_custom_objects(
+            labels=self.selector,
+            group=constants.K8S_METRICS_GROUP,
+            version=constants.K8S_METRICS_VERSION,
+            plural="pods",
+            reraise=True,
+            # Pod metrics have no uid, and every replica samples all experiments
+            sharded=False,
+        )
+        pods_experiments = None
+        usage = {}
+        for pod_metrics in pods_metrics:
+            experiment = (get_metadata_value(pod_metrics, "labels") or {}).get(
+                self.experiment_label
+            )
+            if experiment is None:
+                # Older metrics servers do not copy the pods' labels
+                if pods_experiments is None:
+                    pods_experiments = self._get_pods_experiments()
+                experiment = pods_experiments.get(
+                    get_metadata_value(pod_metrics, "name")
+                )
+                if experiment is None:
+                    continue
+            cpu, memory = get_containers_usage(pod_metrics)
+            total = usage.get(experiment, (0.0, 0.0, 0))
+            usage[experiment] = (total[0] + cpu, total[1] + memory, total[2] + 1)
+        return usage
+
+    def sample_node_metrics(self):
+        nodes = {}
+        for node_metrics in self.manager.list_cluster_custom_objects(
+            group=constants.K8S_METRICS_GROUP,
+            version=constants.K8S_METRICS_VERSION,
+            plural="nodes",
+            reraise=True,
+        ):
+            usage = node_metrics.get("usage") or {}
+            nodes[get_metadata_value(node_metrics, "name")] = {
+                "cpu": parse_quantity(usage.get("cpu", 0)),
+                "memory": parse_quantity(usage.get("memory", 0)),
+            }
+        return nodes
+
+    def tick(self):
+        usage = self.sample_pods()
+        nodes = self.sample_node_metrics() if self.sample_nodes else self.nodes
+        with self._lock:
+            self.samples += 1
+            for experiment, (cpu, memory, pods) in usage.items():
+                experiment_usage = self._experiments.get(experiment)
+                if experiment_usage is None:
+                    experiment_usage = ExperimentUsage(self.window)
+                    self._experiments[experiment] = experiment_usage
+                experiment_usage.cpu.add(cpu)
+                experiment_usage.memory.add(memory)
+                experiment_usage.pods = pods
+                experiment_usage.last_seen = self.samples
+            for experiment in [
+                e
+                for e, u in self._experiments.items()
+                if self.samples - u.last_seen >= self.max_idle
+            ]:
+                del self._experiments[experiment]
+            self.nodes = nodes
+
+    def get_usage(self, experiment):
+        with self._lock:
+            experiment_usage = self._experiments.get(experiment)
+            return experiment_usage.to_dict() if experiment_usage else None
+
+    def get_experiments(self):
+        with self._lock:
+            return list(self._experiments.keys())
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+from unittest import TestCase
+
+from kubernetes import client
+from kubernetes.client import Configuration
+from kubernetes.client.rest import ApiException
+from mock import MagicMock, patch
+
+from polyaxon_k8s.admission import RESOURCE_QUOTAS, AdmissionController
+from polyaxon_k8s.manager import K8SManager
+
+
+def _pod(requests=None, limits=None):
+    return client.V1Pod(
+        spec=client.V1PodSpec(
+            containers=[
+                client.V1Container(
+                    name="main",
+                    resources=client.V1ResourceRequirements(
+                        requests=requests, limits=limits
+                    ),
+                )
+            ]
+        )
+    )
+
+
+def _quota(hard, used=None, name="quota", resource_version="2"):
+    return client.V1ResourceQuota(
+        metadata=client.V1ObjectMeta(name=name, resource_version=resource_version),
+        spec=client.V1ResourceQuotaSpec(hard=hard),
+        status=client.V1ResourceQuotaStatus(hard=hard, used=used or {}),
+    )
+
+
+def _meta(resource_version):
+    return client.V1ObjectMeta(name="obj", resource_version=resource_version)
+
+
+def _limit_range(**kwargs):
+    return client.V1LimitRange(
+        metadata=client.V1ObjectMeta(name="limits"),
+        spec=client.V1LimitRangeSpec(
+            limits=[client.V1LimitRangeItem(type="Container", **kwargs)]
+        ),
+    )
+
+
+def _list(items):
+    return MagicMock(items=items, metadata=client.V1ListMeta(resource_version="1"))
+
+
+class TestAdmissionController(TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.quotas = []
+        self.limit_ranges = []
+
+        def call(api_call, **kwargs):
+            if api_call == self.manager.k8s_api.list_namespaced_resource_quota:
+                return _list(self.quotas)
+            return _list(self.limit_ranges)
+
+        self.manager._call.side_effect = call
+        self.admission = AdmissionController(manager=self.manager)
+        # The views are listed, but not watched
+        patcher = patch.object(AdmissionController, "_run")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_limit_range(self):
+        self.limit_ranges = [
+            _limit_range(
+                default={"cpu": "1", "memory": "1Gi"},
+                default_request={"cpu": "500m"},
+                max={"cpu": "2"},
+            )
+        ]
+        pod = _pod(limits={"memory": "2Gi"})
+        self.admission.admit(kind="Pod", body=pod, namespace="ns")
+        assert pod.spec.containers[0].resources.limits == {
+            "cpu": "1",
+            "memory": "2Gi",
+        }
+        assert pod.spec.containers[0].resources.requests == {
+            "cpu": "500m",
+            "memory": "2Gi",
+        }
+
+        with self.assertRaises(ApiException) as context:
+            self.admission.admit(
+                kind="Pod", body=_pod(limits={"cpu": 4}), namespace="ns"
+            )
+        assert context.exception.status == 403
+        # The view is listed once per namespace
+        assert self.manager._call.call_count == 2
+
+    def test_limits_default_requests(self):
+        self.limit_ranges = [_limit_range(default_request={"cpu": "100m"})]
+        pod = _pod(limits={"cpu": "2"})
+        self.admission.admit(kind="Pod", body=pod, namespace="ns")
+        # The apiserver defaults the request to the limit before the LimitRanger
+        assert pod.spec.containers[0].resources.requests == {"cpu": "2"}
+
+    def test_quota_reservations(self):
+        self.quotas = [
+            _quota(
+                {"requests.cpu": "2", "pods": "5", "count/jobs.batch": "1"},
+                {"pods": "1"},
+            )
+        ]
+        job = client.V1Job(
+            spec=client.V1JobSpec(parallelism=10, template=_pod(requests={"cpu": "1"}))
+        )
+        with self.assertRaises(ApiException):
+            self.admission.admit(
+                kind="Pod", body=_pod(requests={"cpu": "3"}), namespace="ns"
+            )
+        with self.assertRaises(ApiException):
+            # Every container must request cpu
+            self.admission.admit(kind="Pod", body=_pod(), namespace="ns")
+
+        # The job controller creates as many pods as the quota allows
+        reservation = self.admission.admit(kind="Job", body=job, namespace="ns")
+        assert reservation.usage["requests.cpu"] == 10
+        assert reservation.usage["count/jobs.batch"] == 1
+        with self.assertRaises(ApiException):
+            self.admission.admit(kind="Job", body=job, namespace="ns")
+        # The reserved pods count against pods
+        with self.assertRaises(ApiException):
+            self.admission.admit(
+                kind="Pod", body=_pod(requests={"cpu": "1"}), namespace="ns"
+            )
+
+        # Releasing a refused launch frees its usage
+        self.admission.release(reservation)
+        reservation = self.admission.admit(kind="Job", body=job, namespace="ns")
+
+        # Job pods are counted by the quota once the job controller creates them
+        self.admission.confirm(reservation, client.V1Job(metadata=_meta("10")))
+        view = self.admission._views["ns"]
+        used = _quota({"requests.cpu": "2"}, resource_version="11")
+        self.admission.handle_event(view, RESOURCE_QUOTAS, "MODIFIED", used)
+        assert view.get_reserved("requests.cpu", reservation_ttl=30) == 10
+        assert view.get_reserved("requests.cpu", reservation_ttl=0) == 0
+
+    def test_pods_count(self):
+        job = client.V1Job(spec=client.V1JobSpec(parallelism=0, template=_pod()))
+        reservation = self.admission.admit(kind="Job", body=job, namespace="ns")
+        assert reservation.usage["pods"] == 0
+        job.spec.parallelism = None
+        job.spec.completions = 3
+        reservation = self.admission.admit(kind="Job", body=job, namespace="ns")
+        assert reservation.usage["pods"] == 1
+
+    def test_unconfirmed_reservation_expires(self):
+        reservation = self.admission.admit(kind="Pod", body=_pod(), namespace="ns")
+        view = self.admission._views["ns"]
+        assert view.get_reserved("pods", reservation_ttl=30) == 1
+        reservation.created_at -= 60
+        assert view.get_reserved("pods", reservation_ttl=30) == 0
+
+    def test_pod_reservation_released_by_newer_quota(self):
+        self.quotas = [_quota({"pods": "1"})]
+        reservation = self.admission.admit(kind="Pod", body=_pod(), namespace="ns")
+        self.admission.confirm(reservation, client.V1Pod(metadata=_meta("10")))
+        view = self.admission._views["ns"]
+        # An update from before the pod was created is still in flight
+        old = _quota({"pods": "1"}, resource_version="9")
+        self.admission.handle_event(view, RESOURCE_QUOTAS, "MODIFIED", old)
+        assert view.get_reserved("pods", reservation_ttl=30) == 1
+        new = _quota({"pods": "1"}, {"pods": "1"}, resource_version="12")
+        self.admission.handle_event(view, RESOURCE_QUOTAS, "MODIFIED", new)
+        assert view.get_reserved("pods", reservation_ttl=30) == 0
+        with self.assertRaises(ApiException):
+            self.admission.admit(kind="Pod", body=_pod(), namespace="ns")
+
+    def test_queue(self):
+        self.quotas = [_quota({"pods": "1"})]
+        reservation = self.admission.admit(kind="Pod", body=_pod(), namespace="ns")
+        with self.assertRaises(ApiException):
+            self.admission.admit(
+                kind="Pod", body=_pod(), namespace="ns", queue_timeout=0.05
+            )
+
+        timer = threading.Timer(0.05, self.admission.release, args=(reservation,))
+        timer.start()
+        assert (
+            self.admission.admit(
+                kind="Pod", body=_pod(), namespace="ns", queue_timeout=5
+            )
+            is not None
+        )
+        timer.join()
+
+    def test_manager_create(self):
+        k8s_manager = K8SManager(k8s_config=Configuration(), namespace="ns")
+        k8s_manager.admission = self.admission
+        self.quotas = [_quota({"pods": "1"}, {"pods": "1"})]
+        with patch.object(
+            client.CoreV1Api, "create_namespaced_pod", autospec=True
+        ) as create:
+            with self.assertRaises(ApiException):
+                k8s_manager.create_pod(name="pod", body=_pod())
+        assert create.call_count == 0
+
+    def test_manager_create_releases(self):
+        k8s_manager = K8SManager(k8s_config=Configuration(), namespace="ns")
+        k8s_manager.admission = self.admission
+        self.quotas = [_quota({"pods": "1"})]
+        with patch.object(
+            client.CoreV1Api, "create_namespaced_pod", autospec=True
+        ) as create:
+            # E.g. the pod was created, but the response did not deserialize
+            create.side_effect = ValueError("Invalid value")
+            with self.assertRaises(ValueError):
+                k8s_manager.create_pod(name="pod", body=_pod())
+        assert self.admission._views["ns"].reservations == {}
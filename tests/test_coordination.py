@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import time
+
+from unittest import TestCase
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from mock import MagicMock
+
+from polyaxon_k8s.coordination import HashRing, LeaderElector, ShardCoordinator, _now
+
+
+class TestHashRing(TestCase):
+    def test_empty_ring(self):
+        assert HashRing().get_member("foo") is None
+
+    def test_rebalance_moves_few_keys(self):
+        keys = ["experiment-{}".format(i) for i in range(1000)]
+        ring = HashRing(["a", "b", "c"])
+        before = {k: ring.get_member(k) for k in keys}
+        assert set(before.values()) == {"a", "b", "c"}
+
+        assert ring.set_members(["a", "b", "c", "d"]) is True
+        assert ring.set_members(["d", "c", "b", "a"]) is False
+        after = {k: ring.get_member(k) for k in keys}
+        moved = [k for k in keys if before[k] != after[k]]
+        assert all(after[k] == "d" for k in moved)
+        assert len(moved) < 500
+
+
+class TestShardCoordinator(TestCase):
+    def test_owns(self):
+        shard = ShardCoordinator(
+            manager=MagicMock(), group="operator", identity="a", shard_label="exp"
+        )
+        shard.ring.set_members(["a", "b"])
+        objs = [
+            {"metadata": {"uid": str(i), "labels": {"exp": str(i % 10)}}}
+            for i in range(100)
+        ]
+        owned = [o for o in objs if shard.owns(o)]
+        assert 0 < len(owned) < 100
+        # Objects of the same experiment live on the same replica
+        owned_experiments = {o["metadata"]["labels"]["exp"] for o in owned}
+        assert len(owned) == 10 * len(owned_experiments)
+
+    def test_refresh_members_skips_expired_leases(self):
+        now = _now()
+
+        def lease(identity, renew_time):
+            return client.V1Lease(
+                spec=client.V1LeaseSpec(
+                    holder_identity=identity,
+                    lease_duration_seconds=15,
+                    renew_time=renew_time,
+                )
+            )
+
+        manager = MagicMock()
+        manager.list_leases.return_value = [
+            lease("a", now),
+            lease("b", now - datetime.timedelta(seconds=60)),
+        ]
+        on_rebalance = MagicMock()
+        shard = ShardCoordinator(
+            manager=manager, group="operator", identity="a", on_rebalance=on_rebalance
+        )
+        shard.refresh_members()
+        assert shard.members == {"a"}
+        on_rebalance.assert_called_once_with(frozenset(["a"]))
+
+
+class TestLeaderElector(TestCase):
+    def test_acquire_new_lease(self):
+        manager = MagicMock()
+        manager.get_lease.return_value = None
+        elector = LeaderElector(manager=manager, name="operator", identity="a")
+        elector.tick()
+        assert elector.is_leader is True
+        assert manager.create_lease.call_count == 1
+
+    def test_held_lease(self):
+        lease = client.V1Lease(
+            spec=client.V1LeaseSpec(
+                holder_identity="b", lease_duration_seconds=15, renew_time=_now()
+            )
+        )
+        manager = MagicMock()
+        manager.get_lease.return_value = lease
+        elector = LeaderElector(manager=manager, name="operator", identity="a")
+        elector.tick()
+        assert elector.is_leader is False
+        assert manager.update_lease.call_count == 0
+
+    def test_expired_lease(self):
+        lease = client.V1Lease(
+            spec=client.V1LeaseSpec(
+                holder_identity="b",
+                lease_duration_seconds=15,
+                renew_time=_now() - datetime.timedelta(seconds=60),
+                lease_transitions=1,
+            )
+        )
+        manager = MagicMock()
+        manager.get_lease.return_value = lease
+        elector = LeaderElector(manager=manager, name="operator", identity="a")
+        elector.tick()
+        assert elector.is_leader is True
+        assert lease.spec.holder_identity == "a"
+        assert lease.spec.lease_transitions == 2
+
+    def test_conflict(self):
+        lease = client.V1Lease(spec=client.V1LeaseSpec(holder_identity=""))
+        manager = MagicMock()
+        manager.get_lease.return_value = lease
+        manager.update_lease.side_effect = ApiException(status=409)
+        elector = LeaderElector(manager=manager, name="operator", identity="a")
+        elector.tick()
+        assert elector.is_leader is False
+
+    def test_renew_deadline(self):
+        manager = MagicMock()
+        manager.get_lease.return_value = None
+        on_stopped_leading = MagicMock()
+        elector = LeaderElector(
+            manager=manager,
+            name="operator",
+            identity="a",
+            on_stopped_leading=on_stopped_leading,
+        )
+        elector.tick()
+        assert elector.is_leader is True
+        assert manager.get_lease.call_args[1]["request_timeout"] == 5
+
+        # E.g. the next renew hangs, the lease is about to expire
+        elector._renewed_at -= 11
+        assert elector.is_leader is False
+        manager.create_lease.side_effect = ApiException(status=409)
+        elector.tick()
+        assert on_stopped_leading.call_count == 1
+
+    def test_failing_callback(self):
+        manager = MagicMock()
+        manager.get_lease.return_value = None
+        on_stopped_leading = MagicMock()
+        elector = LeaderElector(
+            manager=manager,
+            name="operator",
+            identity="a",
+            retry_period=0.01,
+            on_started_leading=MagicMock(side_effect=RuntimeError),
+            on_stopped_leading=on_stopped_leading,
+        )
+        elector.start()
+        start = time.time()
+        while manager.create_lease.call_count < 2 and time.time() - start < 5:
+            time.sleep(0.01)
+        # The runner keeps renewing, and steps down when it stops
+        assert manager.create_lease.call_count >= 2
+        elector.stop()
+        assert elector.is_leader is False
+        assert on_stopped_leading.call_count == 1
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import json
+import threading
+
+from unittest import TestCase
+
+from kubernetes import client
+from mock import MagicMock, patch
+
+from polyaxon_k8s.events import EventStream
+from polyaxon_k8s.resilience import Watch
+
+
+def _event(name, uid, reason, message, count=1, kind="Pod"):
+    return client.V1Event(
+        metadata=client.V1ObjectMeta(name=name),
+        involved_object=client.V1ObjectReference(uid=uid, kind=kind, name=uid),
+        reason=reason,
+        message=message,
+        count=count,
+        type="Warning",
+    )
+
+
+class TestEventStream(TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.stream = EventStream(manager=self.manager, history_size=2, max_objects=2)
+
+    def test_compaction(self):
+        self.stream.handle_event(_event("e1", "pod1", "BackOff", "restarting"))
+        self.stream.handle_event(_event("e1", "pod1", "BackOff", "restarting", 3))
+        self.stream.handle_event(_event("e2", "pod1", "BackOff", "restarting"))
+        history = self.stream.get_history("pod1")
+        assert len(history) == 1
+        assert history[0]["reason"] == "BackOff"
+        assert history[0]["count"] == 4
+
+    def test_bounded_history(self):
+        for reason in ["Scheduled", "Pulling", "Pulled"]:
+            self.stream.handle_event(_event(reason, "pod1", reason, ""))
+        assert [e["reason"] for e in self.stream.get_history("pod1")] == [
+            "Pulling",
+            "Pulled",
+        ]
+
+        self.stream.handle_event(_event("e", "pod2", "Scheduled", ""))
+        self.stream.handle_event(_event("e", "pod3", "Scheduled", ""))
+        assert self.stream.get_history("pod1") == []
+        assert len(self.stream.get_history("pod3")) == 1
+
+    def test_subscriptions(self):
+        pod = client.V1Pod(metadata=client.V1ObjectMeta(labels={"experiment": "1"}))
+        self.manager.get_pod.return_value = pod
+        by_uid = MagicMock()
+        by_labels = MagicMock()
+        with patch("polyaxon_k8s.events.threading.Thread") as thread:
+            first = self.stream.subscribe(by_uid, uid="pod2")
+            second = self.stream.subscribe(by_labels, labels={"experiment": "1"})
+        # Subscribers share the upstream watch
+        assert thread.call_count == 1
+
+        self.stream.handle_event(_event("e1", "pod1", "OOMKilled", ""))
+        self.stream.handle_event(_event("e2", "pod1", "BackOff", ""))
+        self.stream.handle_event(_event("e3", "pod2", "FailedScheduling", ""))
+
+        assert by_uid.call_count == 1
+        assert by_uid.call_args[0][0] == "pod2"
+        # Labels are fetched once per uid
+        assert by_labels.call_count == 3
+        assert self.manager.get_pod.call_count == 2
+
+        self.stream.unsubscribe(first)
+        self.stream.unsubscribe(second)
+        assert self.stream._stop_event is None
+
+    def test_expired_resource_version(self):
+        line = json.dumps(
+            {
+                "type": "ERROR",
+                "object": {
+                    "kind": "Status",
+                    "apiVersion": "v1",
+                    "status": "Failure",
+                    "message": "too old resource version: 1 (2)",
+                    "reason": "Expired",
+                    "code": 410,
+                },
+            }
+        )
+        error = Watch().unmarshal_event(line, "V1Event")
+        assert error["type"] == "ERROR"
+        assert error["raw_object"]["code"] == 410
+
+        self.stream.resource_version = "1"
+        with patch("polyaxon_k8s.events.Watch") as watch:
+            watch.return_value.stream.return_value = iter([error])
+            self.stream._watch(threading.Event())
+        # The watch restarts from the current state
+        assert self.stream.resource_version is None
+        assert watch.return_value.stream.call_args[1]["resource_version"] == "1"
@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import datetime
+
 from unittest import TestCase
 
 from kubernetes import client
+from kubernetes.client import Configuration
+from kubernetes.client.rest import ApiException
+from mock import patch
 
+from polyaxon_k8s import constants
+from polyaxon_k8s.coordination import ShardCoordinator, _now
+from polyaxon_k8s.exceptions import PolyaxonK8SError
 from polyaxon_k8s.manager import K8SManager
 from tests import base
 
@@ -19,3 +27,106 @@ class TestPolyaxonK8sManager(TestCase):
 
         assert isinstance(k8s_manager.k8s_api, client.CoreV1Api)
         assert isinstance(k8s_manager.k8s_version_api, client.VersionApi)
+
+
+class TestPolyaxonK8sManagerResilience(TestCase):
+    def setUp(self):
+        self.k8s_manager = K8SManager(
+            k8s_config=Configuration(),
+            request_timeout=1.5,
+            circuit_breaker=True,
+            stale_cache_size=10,
+        )
+
+    def test_request_timeout(self):
+        with patch.object(
+            client.CoreV1Api, "read_namespaced_pod", autospec=True
+        ) as read:
+            read.return_value = "pod"
+            assert self.k8s_manager.get_pod("foo") == "pod"
+            read.assert_called_once_with(
+                self.k8s_manager.k8s_api,
+                name="foo",
+                namespace="default",
+                _request_timeout=(0.375, 1.125),
+            )
+            read.reset_mock()
+            # Per call deadlines override the manager's
+            assert self.k8s_manager.get_pod("foo", request_timeout=5) == "pod"
+            read.assert_called_once_with(
+                self.k8s_manager.k8s_api,
+                name="foo",
+                namespace="default",
+                _request_timeout=5,
+            )
+
+    def test_latency_tracked_per_call(self):
+        with patch.object(
+            client.CoreV1Api, "read_namespaced_pod", autospec=True
+        ) as read:
+            read.side_effect = ApiException(status=404)
+            assert self.k8s_manager.get_pod("foo") is None
+        trackers = self.k8s_manager._latency_trackers
+        # Failed calls are observed too
+        assert len(trackers[("CoreV1Api", "read_namespaced_pod")]) == 1
+        assert ("CoreV1Api", "list_namespaced_pod") not in trackers
+
+    def test_circuit_breaker_serves_cached_reads(self):
+        with patch.object(
+            client.CoreV1Api, "read_namespaced_pod", autospec=True
+        ) as read:
+            read.return_value = "pod"
+            assert self.k8s_manager.get_pod("foo") == "pod"
+            read.side_effect = ApiException(status=503)
+            for _ in range(constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+                assert self.k8s_manager.get_pod("bar") is None
+            read.reset_mock()
+            assert self.k8s_manager.get_pod("foo") == "pod"
+            assert self.k8s_manager.get_pod("bar") is None
+            with self.assertRaises(PolyaxonK8SError):
+                self.k8s_manager.get_pod("bar", reraise=True)
+        assert read.call_count == 0
+
+
+class TestPolyaxonK8sManagerShard(TestCase):
+    def test_list_scoped_to_shard(self):
+        k8s_manager = K8SManager(k8s_config=Configuration())
+        pods = [
+            client.V1Pod(metadata=client.V1ObjectMeta(name=str(i), uid=str(i)))
+            for i in range(4)
+        ]
+        with patch.object(
+            client.CoreV1Api, "list_namespaced_pod", autospec=True
+        ) as list_pods:
+            list_pods.return_value = client.V1PodList(items=pods)
+            assert k8s_manager.list_pods(labels="app=foo") == pods
+
+            shard = ShardCoordinator(manager=k8s_manager, group="foo", identity="a")
+            shard.ring.set_members(["a", "b"])
+            k8s_manager.set_shard(shard)
+            owned = k8s_manager.list_pods(labels="app=foo")
+        assert owned == [p for p in pods if shard.owns(p)]
+        assert len(owned) < len(pods)
+
+    def test_leases_not_scoped_to_shard(self):
+        k8s_manager = K8SManager(k8s_config=Configuration())
+        shard = ShardCoordinator(manager=k8s_manager, group="foo", identity="a")
+        k8s_manager.set_shard(shard)
+        leases = [
+            client.V1Lease(
+                metadata=client.V1ObjectMeta(name=identity, uid=identity),
+                spec=client.V1LeaseSpec(
+                    holder_identity=identity,
+                    lease_duration_seconds=15,
+                    renew_time=_now() - datetime.timedelta(seconds=1),
+                ),
+            )
+            for identity in ["a", "b", "c", "d"]
+        ]
+        with patch.object(
+            client.CoordinationV1Api, "list_namespaced_lease", autospec=True
+        ) as list_leases:
+            list_leases.return_value = client.V1LeaseList(items=leases)
+            for _ in range(3):
+                shard.refresh_members()
+                assert shard.members == {"a", "b", "c", "d"}
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import datetime
+import threading
+import time
+
+from unittest import TestCase
+
+from dateutil.tz import tzutc
+from kubernetes import client
+from mock import MagicMock, patch
+
+from polyaxon_k8s.coordination import get_metadata_value
+from polyaxon_k8s.reaper import RateLimiter, Reaper
+
+
+def _ago(seconds):
+    return datetime.datetime.now(tzutc()) - datetime.timedelta(seconds=seconds)
+
+
+def _pod(name, experiment, finished_seconds_ago):
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, labels={"experiment": experiment}),
+        status=client.V1PodStatus(
+            container_statuses=[
+                client.V1ContainerStatus(
+                    name="main",
+                    image="image",
+                    image_id="image",
+                    ready=False,
+                    restart_count=0,
+                    state=client.V1ContainerState(
+                        terminated=client.V1ContainerStateTerminated(
+                            exit_code=0, finished_at=_ago(finished_seconds_ago)
+                        )
+                    ),
+                )
+            ]
+        ),
+    )
+
+
+def _job(name, experiment, completed_seconds_ago=None):
+    return client.V1Job(
+        metadata=client.V1ObjectMeta(name=name, labels={"experiment": experiment}),
+        status=client.V1JobStatus(
+            completion_time=_ago(completed_seconds_ago)
+            if completed_seconds_ago
+            else None
+        ),
+    )
+
+
+def _metadata(name, experiment, created_seconds_ago=0):
+    return {
+        "metadata": {
+            "name": name,
+            "labels": {"experiment": experiment},
+            "creationTimestamp": _ago(created_seconds_ago).isoformat(),
+        }
+    }
+
+
+class TestRateLimiter(TestCase):
+    def test_acquire(self):
+        limiter = RateLimiter(rate=100, burst=2)
+        start = time.time()
+        for _ in range(6):
+            limiter.acquire()
+        assert time.time() - start >= 0.03
+
+
+class TestReaper(TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.manager.list_pods_metadata.return_value = [_metadata("p4", "running")]
+        self.manager.list_pods.return_value = [
+            _pod("p1", "old", 7200),
+            _pod("p2", "recent", 60),
+            _pod("p3", "running", 7200),
+        ]
+        self.manager.list_jobs.return_value = [
+            _job("j1", "old", 7200),
+            _job("j2", "active"),
+        ]
+        self.manager.list_services_metadata.return_value = [
+            _metadata("s1", "old"),
+            _metadata("s2", "active"),
+            _metadata("s3", "leftover", 10000),
+        ]
+        self.manager.list_ingresses_metadata.return_value = []
+        self.manager.shard = None
+        self.reaper = Reaper(
+            manager=self.manager, experiment_label="experiment", ttl=3600, rate=1000
+        )
+
+    def test_find_finished_experiments(self):
+        experiments = self.reaper.find_finished_experiments()
+        assert [e for e, _ in experiments] == ["leftover", "old"]
+        objects = dict(experiments)
+        assert objects["old"] == {"pods": ["p1"], "jobs": ["j1"], "services": ["s1"]}
+        assert objects["leftover"] == {"services": ["s3"]}
+
+    def test_tick(self):
+        self.reaper.tick()
+        self.manager.delete_job.assert_called_once_with(
+            name="j1", reraise=True, propagation_policy="Background"
+        )
+        assert self.manager.delete_pod_collection.call_count == 1
+        assert self.manager.delete_pod_collection.call_args[1]["labels"] == (
+            "experiment=old"
+        )
+        assert sorted(
+            c[1]["name"] for c in self.manager.delete_service.call_args_list
+        ) == ["s1", "s3"]
+        stats = self.reaper.stats.to_dict()
+        assert stats["runs"] == 1
+        assert stats["reaped"] == 4
+        assert stats["backlog"] == 0
+        assert stats["errors"] == 0
+
+    def test_sharded_by_uid(self):
+        self.manager.shard = MagicMock(shard_label=None)
+        # The other shard still runs a job of `old`
+        self.manager.list_jobs.return_value.append(_job("j3", "old"))
+        self.manager.list_pods.return_value.append(_pod("p5", "other", 7200))
+        self.manager.list_ingresses_metadata.return_value = [
+            _metadata("i1", "other", 7200),
+            _metadata("i2", "other", 7200),
+        ]
+
+        def in_shard(obj):
+            name = get_metadata_value(obj, "name")
+            return name not in ("j3", "i2")
+
+        self.manager.in_shard.side_effect = in_shard
+        experiments = self.reaper.find_finished_experiments()
+        assert [e for e, _ in experiments] == ["leftover", "other"]
+        self.reaper.tick()
+        # Objects of other shards are never deleted by label
+        assert self.manager.delete_pod_collection.call_count == 0
+        assert self.manager.delete_ingress_collection.call_count == 0
+        self.manager.delete_pod.assert_called_once_with(name="p5", reraise=True)
+        self.manager.delete_ingress.assert_called_once_with(name="i1", reraise=True)
+
+    def test_start_does_not_block(self):
+        ticking = threading.Event()
+        release = threading.Event()
+
+        def tick():
+            ticking.set()
+            release.wait(5)
+
+        with patch.object(self.reaper, "tick", side_effect=tick):
+            start = time.time()
+            self.reaper.start()
+            assert time.time() - start < 1
+            # The first tick runs in the reaper's thread
+            assert ticking.wait(5)
+            assert self.reaper.is_running
+            release.set()
+            self.reaper.stop()
+        assert not self.reaper.is_running
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from unittest import TestCase
+
+from kubernetes.client.rest import ApiException
+
+from polyaxon_k8s.resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    LatencyTracker,
+    LRUCache,
+    hedged_call,
+    is_server_failure,
+    to_request_timeout,
+)
+
+
+class TestResilience(TestCase):
+    def test_request_timeout(self):
+        assert to_request_timeout(None) is None
+        assert to_request_timeout(5) == 5
+        assert to_request_timeout(2.5) == (0.625, 1.875)
+        assert to_request_timeout((1, 3)) == (1, 3)
+
+    def test_is_server_failure(self):
+        assert is_server_failure(ApiException(status=0))
+        assert is_server_failure(ApiException(status=503))
+        assert is_server_failure(ApiException(status=429))
+        assert not is_server_failure(ApiException(status=404))
+        assert not is_server_failure(ApiException(status=409))
+
+    def test_latency_tracker(self):
+        tracker = LatencyTracker(window=10)
+        assert tracker.percentile(0.95) is None
+        for i in range(20):
+            tracker.observe(i)
+        assert len(tracker) == 10
+        assert tracker.percentile(0) == 10
+        assert tracker.percentile(0.95) == 19
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_CLOSED
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_OPEN
+        assert breaker.allow() is False
+        time.sleep(0.06)
+        assert breaker.allow() is True
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert breaker.allow() is False
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_OPEN
+        time.sleep(0.06)
+        assert breaker.allow() is True
+        breaker.record_success()
+        assert breaker.state == CIRCUIT_CLOSED
+
+    def test_lru_cache(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_hedged_call(self):
+        calls = []
+
+        def read(name):
+            calls.append(name)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        observed = []
+        assert (
+            hedged_call(read, delay=0.01, observe=observed.append, name="pod") == "fast"
+        )
+        assert calls == ["pod", "pod"]
+        # The slow first call is observed once it completes
+        start = time.time()
+        while not observed and time.time() - start < 5:
+            time.sleep(0.01)
+        assert len(observed) == 1
+        assert observed[0] >= 0.5
+
+    def test_hedged_call_raises(self):
+        def read():
+            raise ApiException(status=500)
+
+        with self.assertRaises(ApiException):
+            hedged_call(read, delay=0.01)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import base64
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+from polyaxon_k8s.transfer import (
+    EOF_SENTINEL,
+    TransferManifest,
+    copy_from_pod,
+    copy_to_pod,
+    run_transfers,
+)
+
+
+class FakeExecStream(object):
+    def __init__(self, stdout_chunks=None, stderr="", error=None):
+        self.stdin = []
+        self.stdout_chunks = list(stdout_chunks or [])
+        self.stderr = stderr
+        self.error = error
+        self.is_open = True
+
+    def write(self, data):
+        self.stdin.append(data)
+
+    def read(self, timeout=None):
+        if self.stdout_chunks:
+            return self.stdout_chunks.pop(0)
+        self.is_open = False
+        return ""
+
+    def wait(self, on_stdout=None):
+        while self.stdout_chunks:
+            data = self.read()
+            if on_stdout:
+                on_stdout(data)
+
+    def check(self):
+        if self.error:
+            raise self.error
+
+    def close(self):
+        pass
+
+    def get_stdin_archive(self):
+        lines = "".join(self.stdin).split("\n")
+        data = b"".join(
+            base64.b64decode(line) for line in lines[: lines.index(EOF_SENTINEL)]
+        )
+        return tarfile.open(fileobj=io.BytesIO(data))
+
+
+class TestTransfer(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, "outputs")
+        os.makedirs(os.path.join(self.src, "checkpoints"))
+        for name, size in [("metrics.json", 10), ("checkpoints/model.ckpt", 100000)]:
+            with open(os.path.join(self.src, name), "wb") as f:
+                f.write(os.urandom(size))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_copy_to_pod(self):
+        exec_stream = FakeExecStream()
+        progress = MagicMock()
+        with patch("polyaxon_k8s.transfer._exec", return_value=exec_stream):
+            manifest = copy_to_pod(
+                manager=MagicMock(),
+                pod_name="pod",
+                local_path=self.src,
+                remote_path="/data",
+                progress=progress,
+                chunk_size=1000,
+            )
+        # Lines carry `chunk_size` bytes rounded down to a multiple of 3
+        assert len(base64.b64decode(exec_stream.stdin[0])) == 999
+        archive = exec_stream.get_stdin_archive()
+        assert archive.getnames() == [
+            "outputs",
+            "outputs/checkpoints",
+            "outputs/metrics.json",
+            "outputs/checkpoints/model.ckpt",
+        ]
+        with open(os.path.join(self.src, "checkpoints/model.ckpt"), "rb") as f:
+            assert (
+                archive.extractfile("outputs/checkpoints/model.ckpt").read() == f.read()
+            )
+        assert sorted(manifest.entries) == [
+            "outputs/checkpoints/model.ckpt",
+            "outputs/metrics.json",
+        ]
+        progress.assert_any_call("outputs/checkpoints/model.ckpt", 100000, 100000)
+
+        # Resuming skips the transferred files
+        exec_stream = FakeExecStream()
+        with patch("polyaxon_k8s.transfer._exec", return_value=exec_stream):
+            copy_to_pod(
+                manager=MagicMock(),
+                pod_name="pod",
+                local_path=self.src,
+                remote_path="/data",
+                manifest=TransferManifest.from_dict(manifest.to_dict()),
+            )
+        assert exec_stream.get_stdin_archive().getnames() == [
+            "outputs",
+            "outputs/checkpoints",
+        ]
+
+    def test_copy_from_pod(self):
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tar:
+            tar.add(self.src, arcname="outputs")
+        encoded = base64.b64encode(data.getvalue()).decode("ascii")
+        encoded = "\n".join(encoded[i : i + 76] for i in range(0, len(encoded), 76))
+        # Frames are not aligned on base64 groups or lines
+        stdout_chunks = [encoded[i : i + 1001] for i in range(0, len(encoded), 1001)]
+        exec_stream = FakeExecStream(stdout_chunks)
+        dst = os.path.join(self.tmp, "dst")
+        manifest = TransferManifest({"outputs/metrics.json": (10, 0)})
+        with patch("polyaxon_k8s.transfer._exec", return_value=exec_stream) as _exec:
+            manifest = copy_from_pod(
+                manager=MagicMock(),
+                pod_name="pod",
+                remote_path="/data/outputs/",
+                local_path=dst,
+                manifest=manifest,
+            )
+        command = _exec.call_args[0][2]
+        assert "tar cf - -C /data -X /tmp/.polyaxon-transfer-" in command
+        # The pod only excludes the files whose size and mtime did not change
+        assert exec_stream.stdin[0] == "10 0 outputs/metrics.json\n"
+        assert "stat -c '%s %Y' /data/\"$path\"" in command
+        assert exec_stream.stdin[1].startswith(EOF_SENTINEL + "\n")
+        for name in ["metrics.json", "checkpoints/model.ckpt"]:
+            with open(os.path.join(self.src, name), "rb") as src:
+                with open(os.path.join(dst, "outputs", name), "rb") as f:
+                    assert f.read() == src.read()
+        assert len(manifest) == 2
+
+    def test_copy_to_pod_failure(self):
+        # The pod's tar listed model.ckpt, but failed while extracting it
+        exec_stream = FakeExecStream(
+            stdout_chunks=[
+                "outputs/\noutputs/checkpoints/\noutputs/met",
+                "rics.json\noutputs/checkpoints/model.ckpt\n",
+            ],
+            error=PolyaxonK8SError("No space left on device"),
+        )
+        with patch("polyaxon_k8s.transfer._exec", return_value=exec_stream):
+            with self.assertRaises(PolyaxonK8SError) as context:
+                copy_to_pod(
+                    manager=MagicMock(),
+                    pod_name="pod",
+                    local_path=self.src,
+                    remote_path="/data",
+                )
+        assert sorted(context.exception.manifest.entries) == ["outputs/metrics.json"]
+
+    def test_copy_from_pod_stderr(self):
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tar:
+            tar.add(os.path.join(self.src, "metrics.json"), arcname="metrics.json")
+        exec_stream = FakeExecStream(
+            [base64.b64encode(data.getvalue()).decode("ascii")],
+            stderr="tar: outputs/metrics.json: file changed as we read it",
+        )
+        with patch("polyaxon_k8s.transfer._exec", return_value=exec_stream):
+            with self.assertRaises(PolyaxonK8SError):
+                copy_from_pod(
+                    manager=MagicMock(),
+                    pod_name="pod",
+                    remote_path="/data/outputs",
+                    local_path=os.path.join(self.tmp, "dst"),
+                )
+
+    def test_run_transfers(self):
+        def transfer(pod_name):
+            if pod_name == "pod2":
+                raise PolyaxonK8SError("failed")
+            return pod_name
+
+        results = run_transfers(transfer, pod_names=["pod1", "pod2"])
+        assert results["pod1"] == "pod1"
+        assert isinstance(results["pod2"], PolyaxonK8SError)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+from unittest import TestCase
+
+from mock import MagicMock
+
+from polyaxon_k8s.exceptions import PolyaxonK8SError
+from polyaxon_k8s.quantities import parse_quantity
+from polyaxon_k8s.usage import RollingWindow, UsageSampler
+
+
+def _pod_metrics(name, cpu, memory, labels=None):
+    return {
+        "metadata": {"name": name, "labels": labels},
+        "containers": [{"name": "main", "usage": {"cpu": cpu, "memory": memory}}],
+    }
+
+
+class TestQuantities(TestCase):
+    def test_parse_quantity(self):
+        assert parse_quantity("250m") == 0.25
+        assert parse_quantity("500000000n") == 0.5
+        assert parse_quantity("2") == 2
+        assert parse_quantity("1Ki") == 1024
+        assert parse_quantity("1Gi") == 2 ** 30
+        assert parse_quantity("1M") == 10 ** 6
+        assert parse_quantity("1e3") == 1000
+        assert parse_quantity(3) == 3
+        with self.assertRaises(PolyaxonK8SError):
+            parse_quantity("foo")
+
+
+class TestRollingWindow(TestCase):
+    def test_stats(self):
+        window = RollingWindow(4)
+        assert window.get_stats() is None
+        for value in [10, 1, 2, 3, 4]:
+            window.add(value)
+        assert len(window) == 4
+        assert window.get_stats() == {
+            "min": 1,
+            "max": 4,
+            "avg": 2.5,
+            "p95": 4,
+            "last": 4,
+        }
+
+
+class TestUsageSampler(TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.manager.list_cluster_custom_objects.return_value = [
+            {"metadata": {"name": "node1"}, "usage": {"cpu": "2", "memory": "1Gi"}}
+        ]
+        self.sampler = UsageSampler(
+            manager=self.manager, experiment_label="experiment", window=2, max_idle=2
+        )
+
+    def test_tick(self):
+        self.manager.list_custom_objects.return_value = [
+            _pod_metrics("p1", "500m", "1Mi", {"experiment": "1"}),
+            _pod_metrics("p2", "250m", "1Mi", {"experiment": "1"}),
+            _pod_metrics("p3", "1", "2Mi"),
+        ]
+        self.manager.list_pods_metadata.return_value = [
+            {"metadata": {"name": "p3", "labels": {"experiment": "2"}}}
+        ]
+        self.sampler.tick()
+        assert self.manager.list_pods_metadata.call_count == 1
+        usage = self.sampler.get_usage("1")
+        assert usage["pods"] == 2
+        assert usage["cpu"]["last"] == 0.75
+        assert usage["memory"]["max"] == 2 * 2 ** 20
+        assert self.sampler.get_usage("2")["cpu"]["avg"] == 1
+        assert self.sampler.nodes == {"node1": {"cpu": 2, "memory": 2 ** 30}}
+
+        self.manager.list_custom_objects.return_value = [
+            _pod_metrics("p1", "1", "1Mi", {"experiment": "1"})
+        ]
+        self.sampler.tick()
+        assert self.sampler.get_usage("1")["cpu"]["avg"] == 0.875
+        assert sorted(self.sampler.get_experiments()) == ["1", "2"]
+        self.sampler.tick()
+        assert self.sampler.get_experiments() == ["1"]
+        assert self.sampler.get_usage("1")["samples"] == 2